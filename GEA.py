@@ -1,67 +1,179 @@
-import random
 import numpy
 import math
-from solution import solution
-
-def GEA(objf, lb, ub, dim, N, Max_iteration):
-    # Initialize population
-    if not isinstance(lb, list):
-        lb = [lb] * dim
-    if not isinstance(ub, list):
-        ub = [ub] * dim
-
-    Eagles = numpy.zeros((N, dim))
-    for i in range(dim):
-        Eagles[:, i] = numpy.random.uniform(0, 1, N) * (ub[i] - lb[i]) + lb[i]
-    Fitness = numpy.full(N, float("inf"))
-    
-    Convergence_curve = numpy.zeros(Max_iteration)
-    
-    s = solution()
-        
-    
-    # Evaluate initial fitness
-    for i in range(0, N):
-        Fitness[i] = objf(Eagles[i, :])
-    
-    # Get best initial fitness and position
-    BestFitness = numpy.min(Fitness)
-    BestEagle = Eagles[numpy.argmin(Fitness), :]
-
-    Iteration = 1
-    
-    while Iteration < Max_iteration:
-        # Update position of each eagle
-        for i in range(N):
-            # Random exploration factor
-            R = numpy.random.uniform(0, 1, dim)
-            if numpy.random.rand() < 0.5:
-                Eagles[i, :] = Eagles[i, :] + R * (BestEagle - Eagles[i, :])
-            else:
-                Eagles[i, :] = Eagles[i, :] + R * (Eagles[numpy.random.randint(0, N), :] - Eagles[i, :])
-            
-            # Ensure boundaries
-            Eagles[i, :] = numpy.clip(Eagles[i, :], lb, ub)
-            
-            # Evaluate fitness
-            Fitness[i] = objf(Eagles[i, :])
-            
+from functions import precisionTypes
+import kernels
+from driver import Optimizer, drive
+
+
+def _move_flock(Eagles, R, towards_best, BestEagle, partners, lb_vec, ub_vec, previous=None):
+    """
+    GEA's synchronous move in place on `Eagles`, from the draws R,
+    towards_best and partners: each eagle moves towards the best eagle or
+    towards its partner as the flock stood before the move, then is
+    clipped to the bounds. Leading axes, such as the runs of a lockstep
+    batch, are flocks of their own. The compiled kernel needs (N, dim)
+    scratch space `previous`.
+    """
+    if kernels.compiled():
+        kernels.flockUpdate(Eagles, previous, R, towards_best, BestEagle, partners, lb_vec, ub_vec)
+        return
+    targets = numpy.where(
+        towards_best[..., None], BestEagle[..., None, :], numpy.take_along_axis(Eagles, partners[..., None], axis=-2)
+    )
+    Eagles += R * (targets - Eagles)
+
+    # Ensure boundaries
+    numpy.clip(Eagles, lb_vec, ub_vec, out=Eagles)
+
+
+class GEAOptimizer(Optimizer):
+    """
+    GEA as an ask/tell object. The asynchronous mode, the original and
+    the default, asks for one eagle at a time, so every eagle already
+    follows the best found by the ones before it, and an iteration
+    completes after N tells; the synchronous mode asks for the whole flock
+    once per iteration.
+    """
+
+    name = "GEA"
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, synchronous=False, rng=None, migration=None, precision="double", budget=None):
+        # Random stream of this run: a Generator, a seed or None for fresh entropy
+        self.rng = numpy.random.default_rng(rng)
+        # dtype of the positions, and of evaluation and fitness
+        self.dtype, self.fitness_dtype = precisionTypes(precision)
+        self.dim = dim
+        self.N = N
+        self.synchronous = synchronous
+        self.migration = migration
+
+        # Initialize population
+        if not isinstance(lb, list):
+            lb = [lb] * dim
+        if not isinstance(ub, list):
+            ub = [ub] * dim
+        self.lb_vec = numpy.array(lb, dtype=self.dtype)
+        self.ub_vec = numpy.array(ub, dtype=self.dtype)
+
+        self.Eagles = numpy.zeros((N, dim), dtype=self.dtype)
+        for i in range(dim):
+            self.Eagles[:, i] = self.rng.random(N, dtype=self.dtype) * (self.ub_vec[i] - self.lb_vec[i]) + self.lb_vec[i]
+        self.Fitness = numpy.full(N, float("inf"), dtype=self.fitness_dtype)
+        self.Convergence_curve = self._start(Max_iteration, budget, self.fitness_dtype)
+        self.BestFitness = float("inf")
+        self.BestEagle = None
+
+        self.iteration = 1
+        self.evaluations = 0
+        self._initialized = False  # the initial flock has been scored
+        self._eagle = 0  # next eagle to move in the asynchronous mode
+        self._previous = None  # scratch space of the compiled flock update
+
+    @property
+    def convergence(self):
+        return self.Convergence_curve
+
+    @property
+    def best(self):
+        return self.BestFitness
+
+    @property
+    def bestIndividual(self):
+        return self.BestEagle
+
+    def ask(self):
+        if not self._initialized:
+            return self.Eagles
+
+        Eagles, N, dim, rng = self.Eagles, self.N, self.dim, self.rng
+        if self.synchronous:
+            # Move the whole flock against the positions at the start of the
+            # iteration, then hand it out as one batch
+            R = rng.random((N, dim), dtype=self.dtype)
+            towards_best = rng.random(N) < 0.5
+            partners = rng.integers(0, N, N)
+            if kernels.compiled() and self._previous is None:
+                self._previous = numpy.empty_like(Eagles)
+            _move_flock(Eagles, R, towards_best, self.BestEagle, partners, self.lb_vec, self.ub_vec, self._previous)
+            return Eagles
+
+        # Update the position of the next eagle
+        i = self._eagle
+        # Random exploration factor
+        R = rng.random(dim, dtype=self.dtype)
+        if rng.random() < 0.5:
+            Eagles[i, :] = Eagles[i, :] + R * (self.BestEagle - Eagles[i, :])
+        else:
+            Eagles[i, :] = Eagles[i, :] + R * (Eagles[rng.integers(0, N), :] - Eagles[i, :])
+
+        # Ensure boundaries
+        Eagles[i, :] = numpy.clip(Eagles[i, :], self.lb_vec, self.ub_vec)
+        return Eagles[i:i + 1, :]
+
+    def tell(self, fitness):
+        self.evaluations += len(fitness)
+        if not self._initialized:
+            # Get best initial fitness and position
+            self.Fitness[:] = fitness
+            self.BestFitness = numpy.min(self.Fitness)
+            self.BestEagle = numpy.copy(self.Eagles[numpy.argmin(self.Fitness), :])
+            self._initialized = True
+            return False
+
+        if self.synchronous:
+            self.Fitness[:] = fitness
+            self._update_best()
+        else:
+            i = self._eagle
+            self.Fitness[i] = fitness[0]
             # Update best position and fitness
-            if Fitness[i] < BestFitness:
-                BestFitness = Fitness[i]
-                BestEagle = Eagles[i, :]
+            if self.Fitness[i] < self.BestFitness:
+                self.BestFitness = self.Fitness[i]
+                self.BestEagle = numpy.copy(self.Eagles[i, :])
+            self._eagle = (i + 1) % self.N
+            if self._eagle:
+                return False
+
+        # Trade individuals with the other islands of an island-model run
+        if self.migration is not None and self.migration.due(self.iteration):
+            self.migration.exchange(self.Eagles, self.Fitness)
+            self._update_best()
 
         # Log convergence
-        Convergence_curve[Iteration] = BestFitness
-        
-        # Display progress
-        if Iteration % 1 == 0:
-            print(f"GEA: At iteration {Iteration}, the best fitness is {BestFitness}")
-        
-        Iteration += 1
-    
-    s.convergence = Convergence_curve
-    s.optimizer = "GEA"
-    s.bestIndividual = BestEagle
-
-    return s
+        self._log_best(self.BestFitness)
+        return True
+
+    def _update_best(self):
+        best = numpy.argmin(self.Fitness)
+        if self.Fitness[best] < self.BestFitness:
+            self.BestFitness = self.Fitness[best]
+            self.BestEagle = numpy.copy(self.Eagles[best, :])
+
+    @property
+    def state(self):
+        return {
+            "Eagles": self.Eagles,
+            "Fitness": self.Fitness,
+            "BestEagle": self.BestEagle,
+            "BestFitness": self.BestFitness,
+            "Convergence_curve": self.Convergence_curve,
+            "evaluations": self.evaluations,
+            "elapsed": self.elapsed(),
+        }
+
+    def restore(self, state):
+        self.iteration = state["iteration"]
+        self.Eagles = state["Eagles"]
+        self.Fitness = state["Fitness"]
+        self.BestEagle = state["BestEagle"]
+        self.BestFitness = state["BestFitness"]
+        self.Convergence_curve = state["Convergence_curve"]
+        self.evaluations = state.get("evaluations", self.N * self.iteration)
+        self._initialized = True
+        self._eagle = 0
+        self.startClock(state.get("elapsed", 0.0))
+
+
+def GEA(objf, lb, ub, dim, N, Max_iteration, synchronous=False, checkpoint=None, stopping=None, progress=None, rng=None, migration=None, precision="double", budget=None):
+    optimizer = GEAOptimizer(lb, ub, dim, N, Max_iteration, synchronous, rng, migration, precision, budget)
+    return drive(optimizer, objf, checkpoint, stopping, progress)
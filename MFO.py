@@ -5,167 +5,273 @@ Created on Mon May 16 10:42:18 2016
 @author: hossam
 """
 
-import random
 import numpy
 import math
-from solution import solution
+from functions import precisionTypes
+import kernels
+from driver import Optimizer, drive
 
 
-def MFO(objf, lb, ub, dim, N, Max_iteration):
+def _flame_schedule(optimizer):
+    """
+    Number of flames Eq. (3.14) in the paper, and a, which linearly
+    dicreases from -1 to -2 to calculate t in Eq. (3.12); both follow the
+    iterations done or, under a time budget, the time used
+    """
+    N, Iteration = optimizer.N, optimizer.iteration
+    if optimizer.budget is None:
+        Flame_no = round(N - Iteration * ((N - 1) / optimizer.Max_iteration))
+        a = -1 + Iteration * ((-1) / optimizer.Max_iteration)
+    else:
+        used = optimizer.scheduleFraction()
+        Flame_no = round(N - used * (N - 1))
+        a = -1 - used
+    return Flame_no, a
 
-    # Max_iteration=1000
-    # lb=-100
-    # ub=100
-    # dim=30
-    #N = 50  # Number of search agents
-    if not isinstance(lb, list):
-        lb = [lb] * dim
-    if not isinstance(ub, list):
-        ub = [ub] * dim
 
-    # Initialize the positions of moths
-    Moth_pos = numpy.zeros((N, dim))
-    for i in range(dim):
-        Moth_pos[:, i] = numpy.random.uniform(0, 1, N) * (ub[i] - lb[i]) + lb[i]
-    Moth_fitness = numpy.full(N, float("inf"))
-    # Moth_fitness=numpy.fell(float("inf"))
+def _take_sorted(source, order, out):
+    """ out[..., k] = source[..., order[..., k]] along the population axis, without temporaries """
+    size = source.shape[order.ndim - 1]
+    offsets = numpy.arange(0, order.size // order.shape[-1] * size, size).reshape(order.shape[:-1] + (1,))
+    numpy.take(source.reshape((-1,) + source.shape[order.ndim:]), order + offsets, axis=0, out=out)
 
-    Convergence_curve = numpy.zeros(Max_iteration)
 
-    sorted_population = numpy.copy(Moth_pos)
-    fitness_sorted = numpy.zeros(N)
-    #####################
-    best_flames = numpy.copy(Moth_pos)
-    best_flame_fitness = numpy.zeros(N)
-    ####################
-    double_population = numpy.zeros((2 * N, dim))
-    double_fitness = numpy.zeros(2 * N)
+def _select_flames(Moth_pos, Moth_fitness, best_flames, best_flame_fitness, double_population, double_fitness, first):
+    """
+    Keeps the N best of the moths and the current flames as the new
+    flames, sorted: the moths are copied into the candidate buffers
+    first, so moving them afterwards leaves the candidates untouched. On
+    the `first` iteration the flames are the sorted moths. Leading axes,
+    such as the runs of a lockstep batch, are swarms of their own.
+    """
+    N = Moth_pos.shape[-2]
+    if first:
+        order = numpy.argsort(Moth_fitness, axis=-1)
+        _take_sorted(Moth_pos, order, best_flames)
+        _take_sorted(Moth_fitness, order, best_flame_fitness)
+        return
+    double_population[..., :N, :] = Moth_pos
+    double_fitness[..., :N] = Moth_fitness
+    double_population[..., N:, :] = best_flames
+    double_fitness[..., N:] = best_flame_fitness
+    order = numpy.argsort(double_fitness, axis=-1)[..., :N]
+    _take_sorted(double_population, order, best_flames)
+    _take_sorted(double_fitness, order, best_flame_fitness)
 
-    double_sorted_population = numpy.zeros((2 * N, dim))
-    double_fitness_sorted = numpy.zeros(2 * N)
-    #########################
-    previous_population = numpy.zeros((N, dim))
-    previous_fitness = numpy.zeros(N)
 
-    s = solution()
+def _move_moths(t, a, Flame_no, sorted_population, Moth_pos, distance_to_flame, spiral, moth_index, flame_index):
+    """
+    Eq. (3.12)-(3.13) for every moth and dimension at once, in place on
+    `Moth_pos`, from the uniform draws `t`: moths 0..Flame_no spiral around
+    their own flame, the rest around flame Flame_no. The distance is always
+    taken to the moth's own flame, exactly as in the per-element loop of
+    MFOOptimizer. Every step writes into the preallocated buffers, in the
+    same order of operations as the scalar formula. Leading axes, such as
+    the runs of a lockstep batch, are swarms of their own.
+    """
+    if kernels.compiled():
+        # the same update, fused into one compiled loop
+        kernels.mothSpiral(t, a, sorted_population, Moth_pos, Flame_no)
+        return
+    b = 1
+    t *= a - 1
+    t += 1
+    numpy.subtract(sorted_population, Moth_pos, out=distance_to_flame)
+    numpy.abs(distance_to_flame, out=distance_to_flame)
+    numpy.multiply(t, b, out=spiral)
+    numpy.exp(spiral, out=spiral)
+    distance_to_flame *= spiral
+    numpy.multiply(t, 2, out=spiral)
+    spiral *= math.pi
+    numpy.cos(spiral, out=spiral)
+    distance_to_flame *= spiral
+    numpy.minimum(moth_index, Flame_no, out=flame_index)
+    numpy.take(sorted_population, flame_index, axis=-2, out=spiral)
+    numpy.add(distance_to_flame, spiral, out=Moth_pos)
 
 
-    Iteration = 1
+class MFOOptimizer(Optimizer):
+    """
+    MFO as an ask/tell object: every ask hands out the whole swarm of
+    moths, and the tell that scores it updates the flames and moves the
+    moths, completing one iteration.
+    """
 
-    # Main loop
-    while Iteration < Max_iteration:
+    name = "MFO"
 
-        # Number of flames Eq. (3.14) in the paper
-        Flame_no = round(N - Iteration * ((N - 1) / Max_iteration))
+    def __init__(self, lb, ub, dim, N, Max_iteration, vectorized=True, rng=None, migration=None, precision="double", budget=None):
 
-        for i in range(0, N):
+        # Max_iteration=1000
+        # lb=-100
+        # ub=100
+        # dim=30
+        #N = 50  # Number of search agents
+        # Random stream of this run: a Generator, a seed or None for fresh entropy
+        self.rng = numpy.random.default_rng(rng)
+        # dtype of the positions, and of evaluation and fitness
+        self.dtype, self.fitness_dtype = dtype, fitness_dtype = precisionTypes(precision)
+        self.dim = dim
+        self.N = N
+        self.vectorized = vectorized
+        self.migration = migration
+        if not isinstance(lb, list):
+            lb = [lb] * dim
+        if not isinstance(ub, list):
+            ub = [ub] * dim
+        self.lb = lb
+        self.ub = ub
+        self.lb_vec = numpy.array(lb, dtype=dtype)
+        self.ub_vec = numpy.array(ub, dtype=dtype)
 
-            # Check if moths go out of the search spaceand bring it back
-            for j in range(dim):
-                Moth_pos[i, j] = numpy.clip(Moth_pos[i, j], lb[j], ub[j])
+        # Initialize the positions of moths
+        self.Moth_pos = numpy.zeros((N, dim), dtype=dtype)
+        for i in range(dim):
+            self.Moth_pos[:, i] = self.rng.random(N, dtype=dtype) * (self.ub_vec[i] - self.lb_vec[i]) + self.lb_vec[i]
+        self.Moth_fitness = numpy.full(N, float("inf"), dtype=fitness_dtype)
+        # Moth_fitness=numpy.fell(float("inf"))
 
-            # evaluate moths
-            Moth_fitness[i] = objf(Moth_pos[i, :])
+        self.Convergence_curve = self._start(Max_iteration, budget, fitness_dtype)
 
-        if Iteration == 1:
-            # Sort the first population of moths
-            fitness_sorted = numpy.sort(Moth_fitness)
-            I = numpy.argsort(Moth_fitness)
+        # Every array the main loop writes is allocated once here and reused,
+        # so memory stays flat over the iterations. The flames are the N best
+        # positions found so far, sorted; each iteration they are selected
+        # from the 2N candidates made of a snapshot of the moths just
+        # evaluated followed by the current flames.
+        self.best_flames = numpy.zeros((N, dim), dtype=dtype)
+        self.best_flame_fitness = numpy.zeros(N, dtype=fitness_dtype)
+        self.double_population = numpy.zeros((2 * N, dim), dtype=dtype)
+        self.double_fitness = numpy.zeros(2 * N, dtype=fitness_dtype)
 
-            sorted_population = Moth_pos[I, :]
+        # scratch space of the vectorized position update
+        self.t = numpy.zeros((N, dim), dtype=dtype)
+        self.distance_to_flame = numpy.zeros((N, dim), dtype=dtype)
+        self.spiral = numpy.zeros((N, dim), dtype=dtype)
+        self.moth_index = numpy.arange(N)
+        self.flame_index = numpy.zeros(N, dtype=self.moth_index.dtype)
 
-            # Update the flames
-            best_flames = sorted_population
-            best_flame_fitness = fitness_sorted
+        self.Best_flame_score = float("inf")
+        self.Best_flame_pos = None
+        self.iteration = 1
+        self.evaluations = 0
+
+    @property
+    def convergence(self):
+        return self.Convergence_curve
+
+    @property
+    def best(self):
+        return self.Best_flame_score
+
+    @property
+    def bestIndividual(self):
+        return self.Best_flame_pos
+
+    def ask(self):
+        Moth_pos = self.Moth_pos
+        # Check if moths go out of the search spaceand bring it back
+        if self.vectorized:
+            numpy.clip(Moth_pos, self.lb_vec, self.ub_vec, out=Moth_pos)
         else:
-            #
-            #        # Sort the moths
-            double_population = numpy.concatenate(
-                (previous_population, best_flames), axis=0
-            )
-            double_fitness = numpy.concatenate(
-                (previous_fitness, best_flame_fitness), axis=0
-            )
-            #
-            double_fitness_sorted = numpy.sort(double_fitness)
-            I2 = numpy.argsort(double_fitness)
-            #
-            #
-            for newindex in range(0, 2 * N):
-                double_sorted_population[newindex, :] = numpy.array(
-                    double_population[I2[newindex], :]
-                )
-
-            fitness_sorted = double_fitness_sorted[0:N]
-            sorted_population = double_sorted_population[0:N, :]
-            #
-            #        # Update the flames
-            best_flames = sorted_population
-            best_flame_fitness = fitness_sorted
-
-        #
-        #   # Update the position best flame obtained so far
-        Best_flame_score = fitness_sorted[0]
-        Best_flame_pos = sorted_population[0, :]
-        #
-        previous_population = Moth_pos
-        previous_fitness = Moth_fitness
-        #
-        # a linearly dicreases from -1 to -2 to calculate t in Eq. (3.12)
-        a = -1 + Iteration * ((-1) / Max_iteration)
-
-        # Loop counter
-        for i in range(0, N):
-            #
-            for j in range(0, dim):
-                if (
-                    i <= Flame_no
-                ):  # Update the position of the moth with respect to its corresponsing flame
-                    #
-                    # D in Eq. (3.13)
-                    distance_to_flame = abs(sorted_population[i, j] - Moth_pos[i, j])
-                    b = 1
-                    t = (a - 1) * random.random() + 1
-                    #
-                    #                % Eq. (3.12)
-                    Moth_pos[i, j] = (
-                        distance_to_flame * math.exp(b * t) * math.cos(t * 2 * math.pi)
-                        + sorted_population[i, j]
-                    )
-                #            end
+            for i in range(0, self.N):
+                for j in range(self.dim):
+                    Moth_pos[i, j] = numpy.clip(Moth_pos[i, j], self.lb[j], self.ub[j])
+        return Moth_pos
+
+    def tell(self, fitness):
+        N, Iteration, rng, dtype = self.N, self.iteration, self.rng, self.dtype
+        Moth_pos, Moth_fitness = self.Moth_pos, self.Moth_fitness
+        best_flames, best_flame_fitness = self.best_flames, self.best_flame_fitness
+
+        Flame_no, a = _flame_schedule(self)
+
+        # evaluate moths
+        Moth_fitness[:] = fitness
+        self.evaluations += len(fitness)
+
+        # Trade moths with the other islands of an island-model run
+        if self.migration is not None and self.migration.due(Iteration):
+            self.migration.exchange(Moth_pos, Moth_fitness)
+
+        _select_flames(Moth_pos, Moth_fitness, best_flames, best_flame_fitness,
+                       self.double_population, self.double_fitness, Iteration == 1)
+        sorted_population = best_flames
+
+        # Update the position best flame obtained so far. The flames are
+        # elitist, so the first row of the flame buffer stays the best.
+        self.Best_flame_score = best_flame_fitness[0]
+        self.Best_flame_pos = best_flames[0, :]
+
+        if self.vectorized:
+            # Random draws are consumed in the same (i, j) order as the loop below
+            rng.random(dtype=dtype, out=self.t)
+            _move_moths(self.t, a, Flame_no, sorted_population, Moth_pos, self.distance_to_flame, self.spiral,
+                        self.moth_index, self.flame_index)
+        else:
+            # Loop counter
+            for i in range(0, N):
                 #
-                if (
-                    i > Flame_no
-                ):  # Upaate the position of the moth with respct to one flame
-                    #
-                    #                % Eq. (3.13)
-                    distance_to_flame = abs(sorted_population[i, j] - Moth_pos[i, j])
-                    b = 1
-                    t = (a - 1) * random.random() + 1
+                for j in range(0, self.dim):
+                    if (
+                        i <= Flame_no
+                    ):  # Update the position of the moth with respect to its corresponsing flame
+                        #
+                        # D in Eq. (3.13)
+                        distance_to_flame = abs(sorted_population[i, j] - Moth_pos[i, j])
+                        b = 1
+                        t = (a - 1) * rng.random(dtype=dtype) + 1
+                        #
+                        #                % Eq. (3.12)
+                        Moth_pos[i, j] = (
+                            distance_to_flame * math.exp(b * t) * math.cos(t * 2 * math.pi)
+                            + sorted_population[i, j]
+                        )
+                    #            end
                     #
-                    #                % Eq. (3.12)
-                    Moth_pos[i, j] = (
-                        distance_to_flame * math.exp(b * t) * math.cos(t * 2 * math.pi)
-                        + sorted_population[Flame_no, j]
-                    )
-
-        Convergence_curve[Iteration] = Best_flame_score
-        # Display best fitness along the iteration
-        if Iteration % 1 == 0:
-            print(
-                [
-                    "MFO: At iteration "
-                    + str(Iteration)
-                    + " the best fitness is "
-                    + str(Best_flame_score)
-                ]
-            )
-
-        Iteration = Iteration + 1
-
-    s.convergence = Convergence_curve
-    s.optimizer = "MFO"
-    s.bestIndividual = Best_flame_pos
-    s.objfname = objf.__name__
-
-    return s
\ No newline at end of file
+                    if (
+                        i > Flame_no
+                    ):  # Upaate the position of the moth with respct to one flame
+                        #
+                        #                % Eq. (3.13)
+                        distance_to_flame = abs(sorted_population[i, j] - Moth_pos[i, j])
+                        b = 1
+                        t = (a - 1) * rng.random(dtype=dtype) + 1
+                        #
+                        #                % Eq. (3.12)
+                        Moth_pos[i, j] = (
+                            distance_to_flame * math.exp(b * t) * math.cos(t * 2 * math.pi)
+                            + sorted_population[Flame_no, j]
+                        )
+
+        self._log_best(self.Best_flame_score)
+        return True
+
+    @property
+    def state(self):
+        return {
+            "Moth_pos": self.Moth_pos,
+            "Moth_fitness": self.Moth_fitness,
+            "best_flames": self.best_flames,
+            "best_flame_fitness": self.best_flame_fitness,
+            "Best_flame_score": self.Best_flame_score,
+            "Best_flame_pos": self.Best_flame_pos,
+            "Convergence_curve": self.Convergence_curve,
+            "evaluations": self.evaluations,
+            "elapsed": self.elapsed(),
+        }
+
+    def restore(self, state):
+        self.iteration = state["iteration"]
+        self.Moth_pos = state["Moth_pos"]
+        self.Moth_fitness = state["Moth_fitness"]
+        self.best_flames = state["best_flames"]
+        self.best_flame_fitness = state["best_flame_fitness"]
+        self.Best_flame_score = state["Best_flame_score"]
+        self.Best_flame_pos = self.best_flames[0, :]
+        self.Convergence_curve = state["Convergence_curve"]
+        self.evaluations = state.get("evaluations", self.N * (self.iteration - 1))
+        self.startClock(state.get("elapsed", 0.0))
+
+
+def MFO(objf, lb, ub, dim, N, Max_iteration, vectorized=True, checkpoint=None, stopping=None, progress=None, rng=None, migration=None, precision="double", budget=None):
+    optimizer = MFOOptimizer(lb, ub, dim, N, Max_iteration, vectorized, rng, migration, precision, budget)
+    return drive(optimizer, objf, checkpoint, stopping, progress)
@@ -1,117 +1,175 @@
-import random
 import numpy
 import math
-from solution import solution
-
-
-def SSA(objf, lb, ub, dim, N, Max_iteration):
-
-    # Max_iteration=1000
-    # lb=-100
-    # ub=100
-    # dim=30
-    N = 50  # Number of search agents
-    if not isinstance(lb, list):
-        lb = [lb] * dim
-    if not isinstance(ub, list):
-        ub = [ub] * dim
-    Convergence_curve = numpy.zeros(Max_iteration)
-
-    # Initialize the positions of salps
-    SalpPositions = numpy.zeros((N, dim))
-    for i in range(dim):
-        SalpPositions[:, i] = numpy.random.uniform(0, 1, N) * (ub[i] - lb[i]) + lb[i]
-    SalpFitness = numpy.full(N, float("inf"))
-
-    FoodPosition = numpy.zeros(dim)
-    FoodFitness = float("inf")
-    # Moth_fitness=numpy.fell(float("inf"))
-
-    s = solution()
-
-
-    for i in range(0, N):
-        # evaluate moths
-        SalpFitness[i] = objf(SalpPositions[i, :])
-
-    sorted_salps_fitness = numpy.sort(SalpFitness)
-    I = numpy.argsort(SalpFitness)
-
-    Sorted_salps = numpy.copy(SalpPositions[I, :])
-
-    FoodPosition = numpy.copy(Sorted_salps[0, :])
-    FoodFitness = sorted_salps_fitness[0]
-
-    Iteration = 1
-
-    # Main loop
-    while Iteration < Max_iteration:
-
-        # Number of flames Eq. (3.14) in the paper
-        # Flame_no=round(N-Iteration*((N-1)/Max_iteration));
-
-        c1 = 2 * math.exp(-((4 * Iteration / Max_iteration) ** 2))
-        # Eq. (3.2) in the paper
-
-        for i in range(0, N):
-
-            SalpPositions = numpy.transpose(SalpPositions)
-
-            if i < N / 2:
-                for j in range(0, dim):
-                    c2 = random.random()
-                    c3 = random.random()
-                    # Eq. (3.1) in the paper
-                    if c3 < 0.5:
-                        SalpPositions[j, i] = FoodPosition[j] + c1 * (
-                            (ub[j] - lb[j]) * c2 + lb[j]
-                        )
-                    else:
-                        SalpPositions[j, i] = FoodPosition[j] - c1 * (
-                            (ub[j] - lb[j]) * c2 + lb[j]
-                        )
-
-                    ####################
-
-            elif i >= N / 2 and i < N + 1:
-                point1 = SalpPositions[:, i - 1]
-                point2 = SalpPositions[:, i]
-
-                SalpPositions[:, i] = (point2 + point1) / 2
-                # Eq. (3.4) in the paper
-
-            SalpPositions = numpy.transpose(SalpPositions)
-
-        for i in range(0, N):
-
-            # Check if salps go out of the search spaceand bring it back
-            for j in range(dim):
-                SalpPositions[i, j] = numpy.clip(SalpPositions[i, j], lb[j], ub[j])
-
-            SalpFitness[i] = objf(SalpPositions[i, :])
-
-            if SalpFitness[i] < FoodFitness:
-                FoodPosition = numpy.copy(SalpPositions[i, :])
-                FoodFitness = SalpFitness[i]
-
-        # Display best fitness along the iteration
-        if Iteration % 1 == 0:
-            print(
-                [
-                    "SSA: At iteration "
-                    + str(Iteration)
-                    + " the best fitness is "
-                    + str(FoodFitness)
-                ]
-            )
-
-        Convergence_curve[Iteration] = FoodFitness
-
-        Iteration = Iteration + 1
-
-    s.convergence = Convergence_curve
-    s.optimizer = "SSA"
-    s.bestIndividual = FoodPosition
-    s.objfname = objf.__name__
-
-    return s
\ No newline at end of file
+from functions import precisionTypes
+import kernels
+from driver import Optimizer, drive
+
+
+def _follow_chain(SalpPositions, first, block=64):
+    """
+    Applies x[i] = (x[i-1] + x[i]) / 2 in place for i >= first, where
+    x[i-1] is the already updated predecessor.
+
+    Unrolled, x[first+m] = (x[first-1] + sum_k 2**k * x[first+k]) / 2**(m+1),
+    so each block is one weighted cumulative sum seeded by the last salp of
+    the previous block. Blocks keep the 2**k weights far from overflow.
+    Leading axes, such as the runs of a lockstep batch, are chains of
+    their own. The compiled kernel runs the recurrence itself.
+    """
+    if kernels.compiled():
+        kernels.followChain(SalpPositions, first)
+        return
+    N = SalpPositions.shape[-2]
+    for start in range(first, N, block):
+        stop = min(start + block, N)
+        weights = 2.0 ** numpy.arange(stop - start, dtype=SalpPositions.dtype)
+        scan = numpy.cumsum(SalpPositions[..., start:stop, :] * weights[:, None], axis=-2)
+        SalpPositions[..., start:stop, :] = (SalpPositions[..., start - 1:start, :] + scan) / (
+            2 * weights[:, None]
+        )
+
+
+def _leader_coefficient(optimizer):
+    """ c1 of Eq. (3.2) in the paper, over the iterations done or, under a time budget, the time used """
+    if optimizer.budget is None:
+        return 2 * math.exp(-((4 * optimizer.iteration / optimizer.Max_iteration) ** 2))
+    return 2 * math.exp(-((4 * optimizer.scheduleFraction()) ** 2))
+
+
+def _move_salps(SalpPositions, FoodPosition, c1, c2, c3, leaders, lb_vec, ub_vec):
+    """
+    SSA's move in place on `SalpPositions`, from the draws c2 and c3 of
+    Eq. (3.1): the leaders move around the food, the followers chain
+    behind them by Eq. (3.4), then every salp is clipped to the bounds.
+    Leading axes, such as the runs of a lockstep batch, are swarms of
+    their own.
+    """
+    # Eq. (3.1) in the paper, for all leaders at once
+    step = c1 * ((ub_vec - lb_vec) * c2 + lb_vec)
+    SalpPositions[..., :leaders, :] = FoodPosition[..., None, :] + numpy.where(c3 < 0.5, step, -step)
+
+    # Eq. (3.4) in the paper
+    _follow_chain(SalpPositions, leaders)
+
+    # Check if salps go out of the search spaceand bring it back
+    numpy.clip(SalpPositions, lb_vec, ub_vec, out=SalpPositions)
+
+
+class SSAOptimizer(Optimizer):
+    """
+    SSA as an ask/tell object. The first ask hands out the initial salps;
+    every later ask moves the leaders and the chain and hands out the whole
+    swarm, and the tell that scores it completes one iteration.
+    """
+
+    name = "SSA"
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, rng=None, migration=None, precision="double", budget=None):
+
+        # Max_iteration=1000
+        # lb=-100
+        # ub=100
+        # dim=30
+        # Random stream of this run: a Generator, a seed or None for fresh entropy
+        self.rng = numpy.random.default_rng(rng)
+        # dtype of the positions, and of evaluation and fitness
+        self.dtype, self.fitness_dtype = dtype, fitness_dtype = precisionTypes(precision)
+        self.dim = dim
+        self.N = N
+        self.migration = migration
+        if not isinstance(lb, list):
+            lb = [lb] * dim
+        if not isinstance(ub, list):
+            ub = [ub] * dim
+        self.lb_vec = numpy.array(lb, dtype=dtype)
+        self.ub_vec = numpy.array(ub, dtype=dtype)
+        # salps 0..leaders-1 (i < N / 2) lead, the rest follow in a chain
+        self.leaders = (N + 1) // 2
+        self.Convergence_curve = self._start(Max_iteration, budget, fitness_dtype)
+
+        # Initialize the positions of salps
+        self.SalpPositions = numpy.zeros((N, dim), dtype=dtype)
+        for i in range(dim):
+            self.SalpPositions[:, i] = self.rng.random(N, dtype=dtype) * (self.ub_vec[i] - self.lb_vec[i]) + self.lb_vec[i]
+        self.SalpFitness = numpy.full(N, float("inf"), dtype=fitness_dtype)
+
+        self.FoodPosition = numpy.zeros(dim, dtype=dtype)
+        self.FoodFitness = float("inf")
+
+        self.iteration = 1
+        self.evaluations = 0
+        self._initialized = False  # the initial salps have been scored
+
+    @property
+    def convergence(self):
+        return self.Convergence_curve
+
+    @property
+    def best(self):
+        return self.FoodFitness
+
+    @property
+    def bestIndividual(self):
+        return self.FoodPosition
+
+    def ask(self):
+        if not self._initialized:
+            return self.SalpPositions
+
+        leaders = self.leaders
+        c1 = _leader_coefficient(self)
+        c2 = self.rng.random((leaders, self.dim), dtype=self.dtype)
+        c3 = self.rng.random((leaders, self.dim), dtype=self.dtype)
+        _move_salps(self.SalpPositions, self.FoodPosition, c1, c2, c3, leaders, self.lb_vec, self.ub_vec)
+        return self.SalpPositions
+
+    def tell(self, fitness):
+        self.SalpFitness[:] = fitness
+        self.evaluations += len(fitness)
+        if not self._initialized:
+            I = numpy.argsort(self.SalpFitness)
+            self.FoodPosition = numpy.copy(self.SalpPositions[I[0], :])
+            self.FoodFitness = self.SalpFitness[I[0]]
+            self._initialized = True
+            return False
+
+        # Trade salps with the other islands of an island-model run
+        if self.migration is not None and self.migration.due(self.iteration):
+            self.migration.exchange(self.SalpPositions, self.SalpFitness)
+
+        # argmin keeps the first of equal minima, like the per-salp scan did
+        best = numpy.argmin(self.SalpFitness)
+        if self.SalpFitness[best] < self.FoodFitness:
+            self.FoodPosition = numpy.copy(self.SalpPositions[best, :])
+            self.FoodFitness = self.SalpFitness[best]
+
+        self._log_best(self.FoodFitness)
+        return True
+
+    @property
+    def state(self):
+        return {
+            "SalpPositions": self.SalpPositions,
+            "SalpFitness": self.SalpFitness,
+            "FoodPosition": self.FoodPosition,
+            "FoodFitness": self.FoodFitness,
+            "Convergence_curve": self.Convergence_curve,
+            "evaluations": self.evaluations,
+            "elapsed": self.elapsed(),
+        }
+
+    def restore(self, state):
+        self.iteration = state["iteration"]
+        self.SalpPositions = state["SalpPositions"]
+        self.SalpFitness = state["SalpFitness"]
+        self.FoodPosition = state["FoodPosition"]
+        self.FoodFitness = state["FoodFitness"]
+        self.Convergence_curve = state["Convergence_curve"]
+        self.evaluations = state.get("evaluations", self.N * self.iteration)
+        self._initialized = True
+        self.startClock(state.get("elapsed", 0.0))
+
+
+def SSA(objf, lb, ub, dim, N, Max_iteration, checkpoint=None, stopping=None, progress=None, rng=None, migration=None, precision="double", budget=None):
+    optimizer = SSAOptimizer(lb, ub, dim, N, Max_iteration, rng, migration, precision, budget)
+    return drive(optimizer, objf, checkpoint, stopping, progress)
@@ -0,0 +1,364 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from functools import partial
+import numpy
+import functions
+from GEA import GEA
+from MFO import MFO
+from SSA import SSA
+from lockstep import lockstep
+import kernels
+
+# Microbenchmarks for the hot paths: every objective in functions.py across
+# dimensions and batch sizes, and one iteration of each optimizer across
+# population sizes and dimensions, in time and in traced memory, also per
+# precision mode along with the effect of that mode on final fitness, and
+# many small runs advanced one after the other against the same runs in
+# lockstep, and the NumPy code against the compiled kernels.
+# Results can be saved as a baseline and later runs compared against it,
+# flagging kernels that got slower or hungrier.
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+FUNCTION_DIMS = [10, 30, 100]
+FUNCTION_BATCHES = [1, 100, 5000]
+OPTIMIZER_SIZES = [50, 500, 5000]
+OPTIMIZER_DIMS = [10, 30]
+LOCKSTEP_RUNS = [9, 270]  # a campaign's benchmarks, and 30 seeds of each
+LOCKSTEP_SIZES = [30, 100]
+LOCKSTEP_DIMS = [10]
+KERNEL_FUNCTIONS = ["perm", "powersum"]  # objectives with a compiled kernel
+KERNEL_DIMS = [10, 30, 100]
+KERNEL_BATCH = 1000
+PRECISION_RUN = {"N": 100, "dim": 30, "Max_iteration": 100, "seeds": 5}  # runs compared for final fitness
+
+optimizers = {
+    "GEA": lambda **kw: GEA(synchronous=True, **kw),
+    "GEA-async": GEA,
+    "MFO": MFO,
+    "MFO-loop": lambda **kw: MFO(vectorized=False, **kw),
+    "SSA": SSA,
+}
+precision_optimizers = {"GEA": optimizers["GEA"], "MFO": MFO, "SSA": SSA}
+
+
+def objective_functions():
+    """ every objective in functions.py, i.e. everything tagged vectorized """
+    return {
+        name: value
+        for name, value in vars(functions).items()
+        if callable(value) and getattr(value, "vectorized", False)
+    }
+
+
+def best_time(fn, repeat=5, min_time=0.05):
+    """ fastest time per call, calling often enough per repeat to be measurable """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_functions(dims, batches, repeat):
+    rng = numpy.random.default_rng(0)
+    results = {}
+    for name, objf in objective_functions().items():
+        for dim in dims:
+            for batch in batches:
+                x = rng.uniform(-5, 5, (batch, dim) if batch > 1 else dim)
+                results[f"function/{name}/dim={dim}/batch={batch}"] = best_time(lambda: objf(x), repeat)
+    return results
+
+
+def iteration_time(optimizer, N, dim, iterations):
+    """
+    seconds per main-loop iteration: the difference between a run with
+    `iterations` more iterations and a minimal run, so set-up cancels out
+    """
+    def run(Max_iteration):
+        start = time.perf_counter()
+        optimizer(objf=functions.sphere, lb=-100, ub=100, dim=dim, N=N, Max_iteration=Max_iteration, rng=0)
+        return time.perf_counter() - start
+
+    return max(run(2 + iterations) - run(2), 0.0) / iterations
+
+
+def iteration_memory(optimizer, N, dim, iterations):
+    """
+    (peak bytes of a minimal run, extra peak bytes per added iteration), as
+    traced by tracemalloc; the second stays near zero when nothing the main
+    loop allocates outlives its iteration
+    """
+    def peak(Max_iteration):
+        tracemalloc.start()
+        try:
+            optimizer(objf=functions.sphere, lb=-100, ub=100, dim=dim, N=N, Max_iteration=Max_iteration, rng=0)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # the minimal run includes one steady-state iteration, after the first,
+    # and a warm-up keeps one-off allocations (lazy imports, caches) out
+    peak(3)
+    base = peak(3)
+    return base, max(peak(3 + iterations) - base, 0) / iterations
+
+
+def bench_memory(sizes, dims, iterations):
+    results = {}
+    for name, optimizer in optimizers.items():
+        for N in sizes:
+            for dim in dims:
+                base, growth = iteration_memory(optimizer, N, dim, iterations)
+                results[f"memory/{name}/N={N}/dim={dim}/peak"] = base
+                results[f"memory/{name}/N={N}/dim={dim}/per-iteration"] = growth
+    return results
+
+
+def describe(key, value):
+    """ a result with its unit: bytes for memory, seconds for everything else """
+    if key.startswith("memory/"):
+        return f"{value / 1024:12.1f} KiB"
+    return f"{value * 1e6:12.1f} us"
+
+
+def bench_optimizers(sizes, dims, iterations, repeat):
+    results = {}
+    for name, optimizer in optimizers.items():
+        for N in sizes:
+            for dim in dims:
+                results[f"optimizer/{name}/N={N}/dim={dim}"] = min(
+                    iteration_time(optimizer, N, dim, iterations) for _ in range(repeat)
+                )
+    return results
+
+
+def bench_precision(sizes, dims, iterations, repeat):
+    """ iteration time and peak memory of each optimizer in every precision mode """
+    results = {}
+    for name, optimizer in precision_optimizers.items():
+        for precision in functions.PRECISIONS:
+            variant = partial(optimizer, precision=precision)
+            for N in sizes:
+                for dim in dims:
+                    key = f"{name}-{precision}/N={N}/dim={dim}"
+                    results[f"optimizer/{key}"] = min(
+                        iteration_time(variant, N, dim, iterations) for _ in range(repeat)
+                    )
+                    results[f"memory/{key}/peak"] = iteration_memory(variant, N, dim, iterations)[0]
+    return results
+
+
+def precision_gains(results):
+    """ per optimizer and size, speedup and memory of every precision mode against double """
+    lines = []
+    for key, seconds in results.items():
+        group, variant, *size = key.split("/")
+        name, _, precision = variant.rpartition("-")
+        if group != "optimizer" or name not in precision_optimizers or precision not in functions.PRECISIONS or precision == "double":
+            continue
+        size = "/".join(size)
+        double = results[f"optimizer/{name}-double/{size}"]
+        memory = results[f"memory/{variant}/{size}/peak"] / results[f"memory/{name}-double/{size}/peak"]
+        lines.append(f"{name} {precision:<6} {size:<14} speedup {double / seconds:5.2f}x, memory {memory:5.2f}x of double")
+    return lines
+
+
+def bench_lockstep(runs, sizes, dims, iterations, repeat):
+    """ seconds per iteration of `runs` runs of each optimizer, one after the other and in lockstep """
+    results = {}
+    for name, optimizer in precision_optimizers.items():
+        for R in runs:
+            def separate(objf, rng, **kw):
+                for seed in range(R):
+                    optimizer(objf=objf, rng=seed, **kw)
+
+            def batched(objf, rng, **kw):
+                lockstep(name, objf, rngs=list(range(R)), **kw)
+
+            for N in sizes:
+                for dim in dims:
+                    key = f"lockstep/{name}/runs={R}/N={N}/dim={dim}"
+                    results[f"{key}/separate"] = min(iteration_time(separate, N, dim, iterations) for _ in range(repeat))
+                    results[f"{key}/lockstep"] = min(iteration_time(batched, N, dim, iterations) for _ in range(repeat))
+    return results
+
+
+def lockstep_gains(results):
+    """ per optimizer, batch and size, speedup of lockstep over one run after the other """
+    lines = []
+    for key, seconds in results.items():
+        group, name, R, *size, mode = key.split("/")
+        if group != "lockstep" or mode != "lockstep":
+            continue
+        size = "/".join(size)
+        separate = results[f"lockstep/{name}/{R}/{size}/separate"]
+        lines.append(f"{name} {R:<9} {size:<14} lockstep speedup {separate / seconds:5.2f}x")
+    return lines
+
+
+def bench_kernels(dims, batch, sizes, opt_dims, iterations, repeat):
+    """ the kernel-backed objectives and the optimizer iterations under every available kernel backend """
+    rng = numpy.random.default_rng(0)
+    available = [name for name in kernels.BACKENDS if name == "numpy" or kernels.numba is not None]
+    previous = kernels.backend
+    results = {}
+    try:
+        for backend in available:
+            kernels.useBackend(backend)
+            kernels.warmUp()
+            for name in KERNEL_FUNCTIONS:
+                objf = getattr(functions, name)
+                for dim in dims:
+                    x = rng.uniform(-1, 1, (batch, dim))
+                    results[f"kernels/{name}/dim={dim}/batch={batch}/{backend}"] = best_time(lambda: objf(x), repeat)
+            for name, optimizer in precision_optimizers.items():
+                for N in sizes:
+                    for dim in opt_dims:
+                        results[f"kernels/{name}/N={N}/dim={dim}/{backend}"] = min(
+                            iteration_time(optimizer, N, dim, iterations) for _ in range(repeat)
+                        )
+    finally:
+        kernels.useBackend(previous)
+    return results
+
+
+def kernel_gains(results):
+    """ speedup of the compiled kernels over NumPy for every kernel benchmark """
+    lines = []
+    for key, seconds in results.items():
+        group, *rest, backend = key.split("/")
+        if group != "kernels" or backend == "numpy":
+            continue
+        case = "/".join(rest)
+        lines.append(f"{case:<32} {backend} speedup {results[f'kernels/{case}/numpy'] / seconds:6.2f}x")
+    if not lines and any(key.startswith("kernels/") for key in results):
+        lines.append("numba is not installed, only the numpy kernels were measured")
+    return lines
+
+
+def precision_fitness(N, dim, Max_iteration, seeds):
+    """
+    (objective, optimizer, {precision: median final best fitness}) for every
+    objective over the same `seeds` in each precision. float32 draws follow
+    another stream than float64 ones, so single runs are not comparable.
+    """
+    rows = []
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        for objective, objf in objective_functions().items():
+            for name, optimizer in precision_optimizers.items():
+                fitness = {
+                    precision: float(numpy.median([
+                        optimizer(
+                            objf=objf, lb=-100, ub=100, dim=dim, N=N, Max_iteration=Max_iteration,
+                            rng=seed, precision=precision,
+                        ).convergence[-1]
+                        for seed in range(seeds)
+                    ]))
+                    for precision in functions.PRECISIONS
+                }
+                rows.append((objective, name, fitness))
+    return rows
+
+
+def compare(results, baseline, threshold):
+    """ (key, baseline, current, ratio) for every kernel slower than baseline by more than threshold """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((key, previous, current, current / previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for objectives and optimizer iterations")
+    parser.add_argument("--quick", action="store_true", help="small grid for a fast check")
+    parser.add_argument("--only", choices=["functions", "optimizers", "memory", "precision", "lockstep", "kernels"], help="run one group only")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per measurement (best is kept)")
+    parser.add_argument("--iterations", type=int, default=3, help="optimizer iterations per measurement")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against")
+    parser.add_argument("--save", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    dims, batches = ([30], [1, 1000]) if args.quick else (FUNCTION_DIMS, FUNCTION_BATCHES)
+    sizes, opt_dims = ([500], [30]) if args.quick else (OPTIMIZER_SIZES, OPTIMIZER_DIMS)
+
+    results = {}
+    if args.only in (None, "functions"):
+        results.update(bench_functions(dims, batches, args.repeat))
+    if args.only in (None, "optimizers"):
+        results.update(bench_optimizers(sizes, opt_dims, args.iterations, args.repeat))
+    if args.only in (None, "memory"):
+        results.update(bench_memory(sizes, opt_dims, args.iterations))
+    if args.only in (None, "lockstep"):
+        runs, lockstep_sizes, lockstep_dims = ([27], [30], [10]) if args.quick else (LOCKSTEP_RUNS, LOCKSTEP_SIZES, LOCKSTEP_DIMS)
+        results.update(bench_lockstep(runs, lockstep_sizes, lockstep_dims, args.iterations, args.repeat))
+    if args.only in (None, "kernels"):
+        kernel_dims, kernel_batch = ([30], 100) if args.quick else (KERNEL_DIMS, KERNEL_BATCH)
+        results.update(bench_kernels(kernel_dims, kernel_batch, sizes, opt_dims, args.iterations, args.repeat))
+    fitness_rows = []
+    if args.only in (None, "precision"):
+        results.update(bench_precision(sizes, opt_dims, args.iterations, args.repeat))
+        run = {"N": 50, "dim": 10, "Max_iteration": 50, "seeds": 3} if args.quick else PRECISION_RUN
+        fitness_rows = precision_fitness(**run)
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    width = max(len(key) for key in results)
+    for key, seconds in results.items():
+        line = f"{key:<{width}}  {describe(key, seconds)}"
+        if baseline.get(key):
+            line += f"  {seconds / baseline[key]:6.2f}x baseline"
+        print(line)
+
+    for line in precision_gains(results):
+        print(line)
+    for line in lockstep_gains(results):
+        print(line)
+    for line in kernel_gains(results):
+        print(line)
+    for objective, name, fitness in fitness_rows:
+        double = fitness["double"]
+        line = f"median fitness {objective:<12} {name}  double {double:12.6g}"
+        for precision, value in fitness.items():
+            if precision != "double":
+                change = (value - double) / abs(double) * 100 if double else float("nan")
+                line += f"  {precision} {value:12.6g} ({change:+8.3f}%)"
+        print(line)
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, previous, current, ratio in regressions:
+        print(f"REGRESSION {key}: {describe(key, previous).strip()} -> {describe(key, current).strip()} ({ratio:.2f}x)")
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=1, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
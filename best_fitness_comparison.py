@@ -1,14 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import ResultsStore
 
-# File paths for the results
-single_file = "optimization_results_single.csv"
-parallel_file = "optimization_results_parallel.csv"
-
-# Load the CSV data into DataFrames
-single_data = pd.read_csv(single_file)
-parallel_data = pd.read_csv(parallel_file)
+# Load the latest single-threaded and parallel campaigns from the results store
+with ResultsStore() as store:
+    columns, rows = store.latestTasks("single")
+    single_data = pd.DataFrame(rows, columns=columns)
+    columns, rows = store.latestTasks("parallel")
+    parallel_data = pd.DataFrame(rows, columns=columns)
+    single_seed = store.campaignParameters(store.latestCampaign("single")).get("root_seed")
+    parallel_seed = store.campaignParameters(store.latestCampaign("parallel")).get("root_seed")
 
 # Merge the data for comparison
 merged_data = pd.merge(
@@ -18,6 +20,12 @@ merged_data = pd.merge(
     suffixes=('_Single', '_Parallel')
 )
 
+# Campaigns run from the same root seed draw the same numbers per task, so
+# any difference between them is a bug rather than chance
+if single_seed is not None and single_seed == parallel_seed:
+    identical = (merged_data["Best Fitness_Single"] == merged_data["Best Fitness_Parallel"]).sum()
+    print(f"Same root seed {single_seed}: {identical}/{len(merged_data)} tasks bit-for-bit identical")
+
 # Extract the relevant columns for plotting
 algorithms = merged_data["Algorithm"]
 benchmarks = merged_data["Benchmark"]
@@ -0,0 +1,101 @@
+import json
+import os
+import numpy
+
+# Snapshots of a running optimizer go to a compressed .npz file that is
+# replaced atomically, so an interrupted write never leaves a torn snapshot.
+# A snapshot holds the optimizer's own arrays and scalars, the iteration to
+# continue from, the state of the run's random generator and the parameters
+# of the run (N, dim, the seed, ...); a snapshot taken with other parameters
+# is not resumed.
+
+
+def _same_parameters(saved, parameters):
+    return json.dumps(saved, sort_keys=True) == json.dumps(parameters, sort_keys=True)
+
+
+class Checkpoint:
+    def __init__(self, path, every=50, parameters=None):
+        self.path = path
+        self.every = every
+        self.parameters = parameters
+
+    def due(self, iteration):
+        return self.every > 0 and iteration % self.every == 0
+
+    def save(self, iteration, rng, **state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as file:
+            numpy.savez_compressed(
+                file,
+                iteration=iteration,
+                rng_state=json.dumps(rng.bit_generator.state),
+                parameters=json.dumps(self.parameters),
+                **state,
+            )
+        os.replace(tmp, self.path)
+
+    def load(self, rng):
+        """
+        Restores the state of the generator `rng` and returns the saved
+        arrays as a dict (0-d entries as Python scalars), or None if there
+        is nothing to resume from or the snapshot belongs to a run with
+        other parameters.
+        """
+        if not os.path.isfile(self.path):
+            return None
+        with numpy.load(self.path) as data:
+            state = {key: data[key] for key in data.files}
+        saved = json.loads(str(state.pop("parameters"))) if "parameters" in state else None
+        if not _same_parameters(saved, self.parameters):
+            return None
+        rng.bit_generator.state = json.loads(str(state.pop("rng_state")))
+        return {key: value.item() if value.ndim == 0 else value for key, value in state.items()}
+
+    def clear(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+# Campaign bookkeeping: every task has a snapshot file while it runs and a
+# small JSON result once it has finished, both named after the task and
+# both only valid for the run parameters they were saved with.
+
+def _task_path(directory, algorithm_name, benchmark, extension):
+    return os.path.join(directory, f"{algorithm_name}_{benchmark}.{extension}")
+
+
+def taskCheckpoint(directory, algorithm_name, benchmark, every, parameters=None):
+    return Checkpoint(_task_path(directory, algorithm_name, benchmark, "npz"), every, parameters)
+
+
+def loadTaskResult(directory, algorithm_name, benchmark, parameters=None):
+    """ the saved result of a finished task, or None if there is none for `parameters` """
+    path = _task_path(directory, algorithm_name, benchmark, "json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as file:
+        result = json.load(file)
+    if not _same_parameters(result.pop("parameters", None), parameters):
+        return None
+    return result
+
+
+def saveTaskResult(directory, result, parameters=None):
+    os.makedirs(directory, exist_ok=True)
+    path = _task_path(directory, result["algorithm"], result["benchmark"], "json")
+    with open(path + ".tmp", "w") as file:
+        json.dump({**result, "parameters": parameters}, file)
+    os.replace(path + ".tmp", path)
+
+
+def clearCampaign(directory):
+    """ drops all snapshots and task results once a campaign has completed """
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith((".npz", ".json", ".tmp")):
+            os.remove(os.path.join(directory, name))
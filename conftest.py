@@ -0,0 +1,22 @@
+import pytest
+import kernels
+
+
+@pytest.fixture
+def numpy_backend():
+    """ runs the test on the NumPy kernels, whatever the default backend """
+    previous = kernels.backend
+    kernels.useBackend("numpy")
+    yield
+    kernels.useBackend(previous)
+
+
+@pytest.fixture(params=["numpy", "numba"])
+def kernel_backend(request):
+    """ runs the test once per kernel backend that is installed """
+    if request.param == "numba":
+        pytest.importorskip("numba")
+    previous = kernels.backend
+    kernels.useBackend(request.param)
+    yield request.param
+    kernels.useBackend(previous)
@@ -0,0 +1,151 @@
+import time
+import numpy
+from solution import solution
+from functions import evaluatePopulation
+from stopping import asCriteria, stopReason
+from progress import ProgressEvent
+
+# Ask/tell stepping for GEA, MFO and SSA. An optimizer object owns the
+# population and the algorithm's state but never evaluates anything: ask()
+# hands out the candidates to score next, tell() takes their fitness and
+# advances. Whoever holds the object decides how and when candidates are
+# evaluated, so runs can be paused, interleaved or share one evaluation
+# backend. drive() is the plain loop the GEA, MFO and SSA functions use;
+# currentSolution() takes the best so far of a run at any point.
+
+
+class Optimizer:
+    """
+    Interface of the ask/tell optimizers. `iteration` is the iteration in
+    progress, starting at 1; `convergence[k]` holds the best fitness after
+    iteration k and `evaluations` counts the candidates told so far.
+    `best` and `bestIndividual` are the best so far at any point.
+
+    With a `budget` of seconds the schedules run on the fraction of that
+    wall-clock budget used instead of the iterations done, and the run
+    ends once the budget is spent, checked after every iteration. A
+    Max_iteration given as well caps the iterations, and the schedules
+    then follow whichever limit is closer; None leaves them uncapped.
+    """
+
+    name = None
+    budget = None
+
+    def _start(self, Max_iteration, budget, dtype):
+        """ sets up the iteration limits and budget clock, and returns an empty convergence curve """
+        if Max_iteration is None and budget is None:
+            raise ValueError("a run needs Max_iteration, a time budget or both")
+        self.Max_iteration = Max_iteration
+        self.budget = budget
+        self.startClock()
+        return numpy.zeros(Max_iteration if Max_iteration is not None else 1024, dtype=dtype)
+
+    def _log_best(self, best):
+        """ logs the best fitness of the iteration just completed and moves on to the next """
+        if self.iteration == self.Convergence_curve.shape[-1]:
+            # an uncapped run outgrew its curve
+            self.Convergence_curve = numpy.concatenate(
+                (self.Convergence_curve, numpy.zeros_like(self.Convergence_curve)), axis=-1
+            )
+        self.Convergence_curve[..., self.iteration] = best
+        self.iteration += 1
+
+    def running(self):
+        """ whether Max_iteration still allows another iteration """
+        return self.Max_iteration is None or self.iteration < self.Max_iteration
+
+    def startClock(self, elapsed=0.0):
+        """ starts the budget clock, `elapsed` seconds in for a resumed run """
+        self._started = time.time() - elapsed
+
+    def elapsed(self):
+        return time.time() - self._started
+
+    def scheduleFraction(self):
+        """ fraction of the run done: of the budget used or of Max_iteration, whichever is further along """
+        fractions = []
+        if self.budget is not None:
+            # a budget spent before the run started leaves it one iteration
+            fractions.append(self.elapsed() / self.budget if self.budget > 0 else 1.0)
+        if self.Max_iteration is not None:
+            fractions.append(self.iteration / self.Max_iteration)
+        return min(max(fractions), 1.0)
+
+    def budgetSpent(self):
+        return self.budget is not None and self.elapsed() >= self.budget
+
+    def ask(self):
+        """ candidates to evaluate next, one per row """
+        raise NotImplementedError
+
+    def tell(self, fitness):
+        """ takes the fitness of the last ask; True once an iteration has completed """
+        raise NotImplementedError
+
+    @property
+    def state(self):
+        """ arrays and scalars that resume the run through restore() """
+        raise NotImplementedError
+
+    def restore(self, state):
+        raise NotImplementedError
+
+
+def drive(optimizer, objf, checkpoint=None, stopping=None, progress=None):
+    """
+    Runs `optimizer` to Max_iteration or its stopping criteria, evaluating
+    every ask with `objf`, and returns the solution. With a checkpoint the
+    run resumes from its last snapshot and takes new ones as it goes; the
+    execution time of a resumed run includes the time before its snapshot.
+    """
+    stopping = asCriteria(stopping)
+    stop_reason = None
+    start_time = time.time()
+
+    # Resume from the last snapshot, if any; the run then started that much earlier
+    state = checkpoint.load(optimizer.rng) if checkpoint is not None else None
+    if state is not None:
+        optimizer.restore(state)
+        start_time -= state.get("elapsed", 0.0)
+
+    while optimizer.running():
+        fitness = evaluatePopulation(objf, optimizer.ask(), optimizer.fitness_dtype)
+        if not optimizer.tell(fitness):
+            continue
+        Iteration = optimizer.iteration - 1
+
+        # Report progress
+        if progress is not None:
+            progress.update(
+                ProgressEvent(optimizer.name, objf.__name__, Iteration, optimizer.best,
+                              optimizer.evaluations, time.time() - start_time)
+            )
+
+        stop_reason = stopReason(stopping, Iteration, optimizer.convergence, start_time, optimizer.evaluations)
+        if not stop_reason and optimizer.budgetSpent():
+            stop_reason = "time_budget"
+
+        if checkpoint is not None and checkpoint.due(optimizer.iteration):
+            checkpoint.save(optimizer.iteration, optimizer.rng, **optimizer.state)
+
+        if stop_reason:
+            break
+
+    s = currentSolution(optimizer, objf.__name__, stop_reason or "max_iteration")
+    s.startTime = start_time
+    s.endTime = time.time()
+    s.executionTime = s.endTime - start_time
+    return s
+
+
+def currentSolution(optimizer, objfname, stop_reason=None):
+    """ the best-so-far solution of `optimizer`, at the last completed iteration """
+    s = solution()
+    s.convergence = optimizer.convergence[:optimizer.iteration]
+    s.stopReason = stop_reason
+    s.stopIteration = optimizer.iteration - 1
+    s.optimizer = optimizer.name
+    s.bestIndividual = optimizer.bestIndividual
+    s.objfname = objfname
+    s.totalNoEvaluation = int(optimizer.evaluations)
+    return s
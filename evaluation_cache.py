@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import numpy
+from functions import evaluatePopulation
+
+
+class EvaluationCache:
+    """
+    Objective wrapper that remembers the fitness of positions it has seen,
+    so agents clipped onto the same boundary corner or collapsed onto the
+    same point are evaluated once. Rows are keyed by their exact bytes, so
+    a run gives the same results with the cache as without it. With
+    `resolution` they are keyed by the grid cell of that size they fall in
+    instead, and a cell reports the fitness of the first position
+    evaluated in it: nearby positions then share a fitness and the results
+    differ from an uncached run. At most `size` positions are kept, the
+    least recently used go first.
+
+    Pass an instance as `objf` to GEA, MFO or SSA. Duplicates within one
+    population are evaluated once too, and the remaining misses go to the
+    wrapped objective in a single batch. Looking rows up costs Python work
+    per row, so the cache pays off for expensive objectives such as custom
+    expressions, not for the cheap built-in functions.
+    """
+
+    vectorized = True
+
+    def __init__(self, objf, size=100000, resolution=None):
+        self.objf = objf
+        self.__name__ = objf.__name__
+        self.size = size
+        self.resolution = resolution
+        self._fitness = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _keys(self, rows):
+        if self.resolution is not None:
+            rows = numpy.round(rows / self.resolution).astype(numpy.int64)
+        rows = numpy.ascontiguousarray(rows)
+        return [row.tobytes() for row in rows]
+
+    def __call__(self, x):
+        x = numpy.asarray(x)
+        if not numpy.issubdtype(x.dtype, numpy.floating):
+            x = x.astype(float)
+        batch_shape = x.shape[:-1]
+        rows = x.reshape(-1, x.shape[-1])
+
+        fitness = numpy.empty(len(rows), dtype=x.dtype)
+        missing = {}  # key -> rows of this call that need it
+        for index, key in enumerate(self._keys(rows)):
+            value = self._fitness.get(key)
+            if value is not None:
+                self._fitness.move_to_end(key)
+                fitness[index] = value
+                self.hits += 1
+            elif key in missing:
+                missing[key].append(index)
+                self.hits += 1
+            else:
+                missing[key] = [index]
+                self.misses += 1
+
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            values = evaluatePopulation(self.objf, rows[first], x.dtype)
+            for (key, indices), value in zip(missing.items(), values):
+                fitness[indices] = value
+                self._fitness[key] = value
+            while len(self._fitness) > self.size:
+                self._fitness.popitem(last=False)
+                self.evictions += 1
+
+        return fitness[0] if not batch_shape else fitness.reshape(batch_shape)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._fitness),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._fitness.clear()
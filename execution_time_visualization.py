@@ -1,14 +1,14 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-
-# File paths for the results
-single_file = "optimization_results_single.csv"
-parallel_file = "optimization_results_parallel.csv"
-
-# Load the CSV data into DataFrames
-single_data = pd.read_csv(single_file)
-parallel_data = pd.read_csv(parallel_file)
+from results_store import ResultsStore
+
+# Load the latest single-threaded and parallel campaigns from the results store
+with ResultsStore() as store:
+    columns, rows = store.latestTasks("single")
+    single_data = pd.DataFrame(rows, columns=columns)
+    columns, rows = store.latestTasks("parallel")
+    parallel_data = pd.DataFrame(rows, columns=columns)
 
 # Merge the data for comparison
 merged_data = pd.merge(
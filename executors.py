@@ -0,0 +1,100 @@
+import os
+import queue
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Manager
+
+try:
+    from threadpoolctl import threadpool_limits  # optional: caps BLAS/OpenMP pools already loaded
+except ImportError:
+    threadpool_limits = None
+
+# Executor backends for the campaign runners. "process" runs every task in
+# its own worker process, "thread" runs tasks as threads of the runner (the
+# vectorized optimizers spend most of their time in NumPy kernels that
+# release the GIL) and "hybrid" runs groups of tasks as threads inside a
+# few worker processes. Whatever the backend, the native thread pools of
+# every worker are capped so that concurrent tasks times native threads
+# stays within the core count.
+
+BACKENDS = ("process", "thread", "hybrid")
+
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def nativeThreadBudget(concurrent_tasks, cores=None):
+    """ native threads each of `concurrent_tasks` tasks may use on `cores` cores (all by default) """
+    return max(1, (cores or os.cpu_count() or 1) // max(1, concurrent_tasks))
+
+
+def limitNativeThreads(threads):
+    """
+    Caps the native thread pools of this process at `threads`: through
+    threadpoolctl for pools that are already loaded when it is installed,
+    numexpr's own setting, and the environment for pools loaded later and
+    for child processes.
+    """
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    if threadpool_limits is not None:
+        threadpool_limits(threads)
+    numexpr = sys.modules.get("numexpr")
+    if numexpr is not None:
+        numexpr.set_num_threads(threads)
+
+
+def campaignChannels(backend, progress=True):
+    """
+    (pids, progress_queue, manager) for a campaign run on `backend`. Threads
+    share plain objects; processes need the proxies of a Manager, which the
+    caller keeps alive for the campaign.
+    """
+    if backend == "thread":
+        return [], queue.Queue() if progress else None, None
+    manager = Manager()
+    return manager.list(), manager.Queue() if progress else None, manager
+
+
+def _run_group(fn, group, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda arguments: fn(*arguments), group))
+
+
+def runTasks(fn, tasks, backend="process", workers=None, threads=2):
+    """
+    fn(*arguments) for every tuple in `tasks`, at most `workers` at a time,
+    with results in task order. Tasks start in list order, so a planned
+    order is kept. `threads` is the number of tasks sharing one process
+    under the hybrid backend.
+    """
+    workers = workers or os.cpu_count()
+    if backend == "process":
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=limitNativeThreads, initargs=(nativeThreadBudget(workers),)
+        ) as executor:
+            futures = [executor.submit(fn, *arguments) for arguments in tasks]
+            return [future.result() for future in futures]
+    if backend == "thread":
+        limitNativeThreads(nativeThreadBudget(workers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fn, *arguments) for arguments in tasks]
+            return [future.result() for future in futures]
+    if backend == "hybrid":
+        # consecutive tasks of a planned order cost about the same, so
+        # grouping them keeps the threads of one process evenly loaded
+        threads = max(1, min(threads, workers))
+        groups = [tasks[start:start + threads] for start in range(0, len(tasks), threads)]
+        with ProcessPoolExecutor(
+            max_workers=max(1, workers // threads), initializer=limitNativeThreads,
+            initargs=(nativeThreadBudget(workers),),
+        ) as executor:
+            futures = [executor.submit(_run_group, fn, group, threads) for group in groups]
+            return [result for future in futures for result in future.result()]
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
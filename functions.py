@@ -1,16 +1,149 @@
+import ast
+from functools import lru_cache
 import numpy as np
+import kernels
 from numpy import sin, cos, tan ,cosh, tanh, sinh, abs, exp, mean, pi, prod, sqrt, sum
 
+try:
+    import numexpr  # optional multithreaded engine for custom expressions
+except ImportError:
+    numexpr = None
+
 function = "sum(x**2)"
 
+# Every registered function accepts either a single position of shape (dim,)
+# or a whole population of shape (N, dim); reductions run over the last axis,
+# so a population is scored in one call and validated for finiteness once.
+# Functions that can do this are tagged with `vectorized = True`, which is
+# what `evaluatePopulation` looks for on the objective it is handed.
+
+def vectorized(f):
+    f.vectorized = True
+    return f
+
+def evaluatePopulation(objf, population, dtype=float):
+    """
+    fitness of every row of `population`, batched when objf supports it.
+    The rows are evaluated in `dtype`, the precision of the returned
+    fitness, so a float32 population scored in float64 is upcast first.
+    """
+    population = np.asarray(population).astype(dtype, copy=False)
+    if getattr(objf, "vectorized", False):
+        return np.asarray(objf(population), dtype=dtype)
+    return np.array([objf(row) for row in population], dtype=dtype)
+
+# Precision modes of the optimizers: the dtype their positions are stored
+# and moved in, and the dtype objectives are evaluated and fitness is kept
+# in. "mixed" halves the memory traffic of the population while fitness,
+# and every reduction inside the objective, stays in float64. The
+# objectives below compute in the dtype of their input.
+PRECISIONS = {
+    "double": (np.float64, np.float64),
+    "single": (np.float32, np.float32),
+    "mixed": (np.float32, np.float64),
+}
 
+def precisionTypes(precision):
+    """ (position dtype, fitness dtype) of a precision mode """
+    if precision not in PRECISIONS:
+        raise ValueError(f"unknown precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+    return PRECISIONS[precision]
 
 def createFunction(f):
+    global function
+    compileFunction(f)  # reject invalid expressions up front
     function = f
 
+@vectorized
 def custom(x):
     x = np.asarray_chkfinite(x)
-    return eval(function)
+    return compileFunction(function)(x)
+
+#...............................................................................
+# Custom objectives are expressions in `x` such as "sum(x**2)". Each distinct
+# text is validated and compiled once. Evaluation sees the population
+# transposed to (dim, N): elementwise operations, x[0], x[1:] and len(x) keep
+# their single-vector meaning and the reductions below run down axis 0, so a
+# single call scores every agent.
+
+def _down(reduction):
+    def reduce(a):
+        return reduction(a, axis=0)
+    return reduce
+
+_customNames = {
+    "sin": sin, "cos": cos, "tan": tan, "sinh": sinh, "cosh": cosh, "tanh": tanh,
+    "abs": abs, "exp": exp, "sqrt": sqrt, "log": np.log,
+    "sum": _down(sum), "mean": _down(mean), "prod": _down(prod),
+    "min": _down(np.min), "max": _down(np.max), "len": len,
+    "pi": pi, "e": np.e,
+}
+_numexprFunctions = {"sin", "cos", "tan", "sinh", "cosh", "tanh", "abs", "exp", "sqrt", "log"}
+_allowedNodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Constant,
+                 ast.Subscript, ast.Slice, ast.Tuple, ast.Load, ast.operator, ast.unaryop)
+
+def _validate( tree, text ):
+    for node in ast.walk(tree):
+        if not isinstance(node, _allowedNodes):
+            raise ValueError(f"unsupported syntax ({type(node).__name__}) in custom function {text!r}")
+        if isinstance(node, ast.Name) and node.id != "x" and node.id not in _customNames:
+            raise ValueError(f"unknown name {node.id!r} in custom function {text!r}")
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords):
+            raise ValueError(f"unsupported call in custom function {text!r}")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(f"unsupported constant {node.value!r} in custom function {text!r}")
+
+def _elementwise( node ):
+    if isinstance(node, ast.Name):
+        return node.id in ("x", "pi", "e")
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.BinOp):
+        return (isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow))
+            and _elementwise(node.left) and _elementwise(node.right))
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, (ast.UAdd, ast.USub)) and _elementwise(node.operand)
+    if isinstance(node, ast.Call):
+        return (node.func.id in _numexprFunctions and len(node.args) == 1
+            and _elementwise(node.args[0]))
+    return False
+
+class _NumexprKernels(ast.NodeTransformer):
+    """ swaps each largest elementwise subexpression of x for a numexpr kernel """
+
+    def __init__(self):
+        self.kernels = []
+
+    def visit(self, node):
+        if (isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Call)) and _elementwise(node)
+                and any(isinstance(n, ast.Name) and n.id == "x" for n in ast.walk(node))):
+            self.kernels.append(ast.unparse(node))
+            return ast.Call(func=ast.Name(id="_kernel", ctx=ast.Load()),
+                            args=[ast.Constant(len(self.kernels) - 1)], keywords=[])
+        return self.generic_visit(node)
+
+@lru_cache(maxsize=None)
+def compileFunction( text, use_numexpr=True ):
+    """ validated, compiled evaluator for a custom expression; cached by text """
+    tree = ast.parse(text, mode="eval")
+    _validate(tree, text)
+    kernels = []
+    if use_numexpr and numexpr is not None:
+        transformer = _NumexprKernels()
+        tree = ast.fix_missing_locations(transformer.visit(tree))
+        kernels = transformer.kernels
+    code = compile(tree, "<custom function>", "eval")
+
+    def evaluate( x ):
+        xt = np.moveaxis(x, -1, 0)
+        names = dict(_customNames, x=xt)
+        if kernels:
+            constants = {"x": xt, "pi": pi, "e": np.e}
+            names["_kernel"] = lambda k: numexpr.evaluate(kernels[k], local_dict=constants)
+        value = eval(code, {"__builtins__": {}}, names)
+        return np.broadcast_to(value, x.shape[:-1])[()]
+
+    return evaluate
 
 def selectFunction(cbIndex):
         switcher = {
@@ -26,150 +159,172 @@ def selectFunction(cbIndex):
     }
         return switcher.get(cbIndex, "nothing")
 
+@vectorized
 def ackley( x, a=20, b=0.2, c=2*pi ):
     x = np.asarray_chkfinite(x)  # ValueError if any NaN or Inf
-    n = len(x)
-    s1 = sum( x**2 )
-    s2 = sum( cos( c * x ))
-    return -a*exp( -b*sqrt( s1 / n )) - exp( s2 / n ) + a + exp(1)
+    n = x.shape[-1]
+    s1 = sum( x**2, axis=-1 )
+    s2 = sum( cos( c * x ), axis=-1)
+    return -a*exp( -b*sqrt( s1 / n )) - exp( s2 / n ) + a + np.e
 
 #...............................................................................
+@vectorized
 def dixonprice( x ):  # dp.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 2, n+1 )
+    n = x.shape[-1]
+    j = np.arange( 2, n+1, dtype=x.dtype )
     x2 = 2 * x**2
-    return sum( j * (x2[1:] - x[:-1]) **2 ) + (x[0] - 1) **2
+    return sum( j * (x2[..., 1:] - x[..., :-1]) **2, axis=-1 ) + (x[..., 0] - 1) **2
 
 #...............................................................................
+@vectorized
 def griewank( x, fr=4000 ):
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 1., n+1 )
-    s = sum( x**2 )
-    p = prod( cos( x / sqrt(j) ))
+    n = x.shape[-1]
+    j = np.arange( 1., n+1, dtype=x.dtype )
+    s = sum( x**2, axis=-1 )
+    p = prod( cos( x / sqrt(j) ), axis=-1)
     return s/fr - p + 1
 
 #...............................................................................
+@vectorized
 def levy( x ):
     x = np.asarray_chkfinite(x)
-    n = len(x)
     z = 1 + (x - 1) / 4
-    return (sin( pi * z[0] )**2
-        + sum( (z[:-1] - 1)**2 * (1 + 10 * sin( pi * z[:-1] + 1 )**2 ))
-        +       (z[-1] - 1)**2 * (1 + sin( 2 * pi * z[-1] )**2 ))
+    return (sin( pi * z[..., 0] )**2
+        + sum( (z[..., :-1] - 1)**2 * (1 + 10 * sin( pi * z[..., :-1] + 1 )**2 ), axis=-1)
+        +       (z[..., -1] - 1)**2 * (1 + sin( 2 * pi * z[..., -1] )**2 ))
 
 #...............................................................................
 michalewicz_m = .5  # orig 10: ^20 => underflow
 
+@vectorized
 def michalewicz( x ):  # mich.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 1., n+1 )
-    return - sum( sin(x) * sin( j * x**2 / pi ) ** (2 * michalewicz_m) )
+    n = x.shape[-1]
+    j = np.arange( 1., n+1, dtype=x.dtype )
+    return - sum( sin(x) * sin( j * x**2 / pi ) ** (2 * michalewicz_m), axis=-1 )
 
 #...............................................................................
+@vectorized
 def perm( x, b=.5 ):
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 1., n+1 )
+    if kernels.compiled():
+        return kernels.perm( x, b )
+    n = x.shape[-1]
+    j = np.arange( 1., n+1, dtype=x.dtype )
+    k = (j / n)[:, None]  # one row per outer term
     xbyj = np.fabs(x) / j
-    return mean([ mean( (j**k + b) * (xbyj ** k - 1) ) **2
-            for k in j/n ])
+    inner = mean( (j**k + b) * (xbyj[..., None, :] ** k - 1), axis=-1 )
+    return mean( inner **2, axis=-1 )
     # original overflows at n=100 --
     # return sum([ sum( (j**k + b) * ((x / j) ** k - 1) ) **2
     #       for k in j ])
 
 #...............................................................................
+@vectorized
 def powell( x ):
     x = np.asarray_chkfinite(x)
-    n = len(x)
+    n = x.shape[-1]
     n4 = ((n + 3) // 4) * 4
     if n < n4:
-        x = np.append( x, np.zeros( n4 - n ))
-    x = x.reshape(( 4, -1 ))  # 4 rows: x[4i-3] [4i-2] [4i-1] [4i]
+        x = np.concatenate( (x, np.zeros( x.shape[:-1] + (n4 - n,), dtype=x.dtype )), axis=-1 )
+    x = x.reshape( x.shape[:-1] + ( 4, -1 ))  # 4 rows: x[4i-3] [4i-2] [4i-1] [4i]
     f = np.empty_like( x )
-    f[0] = x[0] + 10 * x[1]
-    f[1] = sqrt(5) * (x[2] - x[3])
-    f[2] = (x[1] - 2 * x[2]) **2
-    f[3] = sqrt(10) * (x[0] - x[3]) **2
-    return sum( f**2 )
+    f[..., 0, :] = x[..., 0, :] + 10 * x[..., 1, :]
+    f[..., 1, :] = 5 ** .5 * (x[..., 2, :] - x[..., 3, :])
+    f[..., 2, :] = (x[..., 1, :] - 2 * x[..., 2, :]) **2
+    f[..., 3, :] = 10 ** .5 * (x[..., 0, :] - x[..., 3, :]) **2
+    return sum( f**2, axis=(-2, -1) )
 
 #...............................................................................
+@vectorized
 def powersum( x, b=[8,18,44,114] ):  # power.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
+    if kernels.compiled():
+        return kernels.powersum( x, b )
+    n = x.shape[-1]
     s = 0
     for k in range( 1, n+1 ):
         bk = b[ min( k - 1, len(b) - 1 )]  # ?
-        s += (sum( x**k ) - bk) **2  # dim 10 huge, 100 overflows
+        s += (sum( x**k, axis=-1 ) - bk) **2  # dim 10 huge, 100 overflows
     return s
 
 #...............................................................................
+@vectorized
 def rastrigin( x ):  # rast.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    return 10*n + sum( x**2 - 10 * cos( 2 * pi * x ))
+    n = x.shape[-1]
+    return 10*n + sum( x**2 - 10 * cos( 2 * pi * x ), axis=-1)
 
 #...............................................................................
+@vectorized
 def rosenbrock( x ):  # rosen.m
     """ http://en.wikipedia.org/wiki/Rosenbrock_function """
         # a sum of squares, so LevMar (scipy.optimize.leastsq) is pretty good
     x = np.asarray_chkfinite(x)
-    x0 = x[:-1]
-    x1 = x[1:]
-    return (sum( (1 - x0) **2 )
-        + 100 * sum( (x1 - x0**2) **2 ))
+    x0 = x[..., :-1]
+    x1 = x[..., 1:]
+    return (sum( (1 - x0) **2, axis=-1 )
+        + 100 * sum( (x1 - x0**2) **2, axis=-1 ))
 
 #...............................................................................
+@vectorized
 def schwefel( x ):  # schw.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    return 418.9829*n - sum( x * sin( sqrt( abs( x ))))
+    n = x.shape[-1]
+    return 418.9829*n - sum( x * sin( sqrt( abs( x ))), axis=-1)
 
 #...............................................................................
+@vectorized
 def sphere( x ):
     x = np.asarray_chkfinite(x)
-    return sum( x**2 )
+    return sum( x**2, axis=-1 )
 
 #...............................................................................
+@vectorized
 def sum2( x ):
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 1., n+1 )
-    return sum( j * x**2 )
+    n = x.shape[-1]
+    j = np.arange( 1., n+1, dtype=x.dtype )
+    return sum( j * x**2, axis=-1 )
 
 #...............................................................................
+@vectorized
 def trid( x ):
     x = np.asarray_chkfinite(x)
-    return sum( (x - 1) **2 ) - sum( x[:-1] * x[1:] )
+    return sum( (x - 1) **2, axis=-1 ) - sum( x[..., :-1] * x[..., 1:], axis=-1 )
 
 #...............................................................................
+@vectorized
 def zakharov( x ):  # zakh.m
     x = np.asarray_chkfinite(x)
-    n = len(x)
-    j = np.arange( 1., n+1 )
-    s2 = sum( j * x ) / 2
-    return sum( x**2 ) + s2**2 + s2**4
+    n = x.shape[-1]
+    j = np.arange( 1., n+1, dtype=x.dtype )
+    s2 = sum( j * x, axis=-1 ) / 2
+    return sum( x**2, axis=-1 ) + s2**2 + s2**4
 
 #...............................................................................
     # not in Hedar --
 
+@vectorized
 def ellipse( x ):
     x = np.asarray_chkfinite(x)
-    return mean( (1 - x) **2 )  + 100 * mean( np.diff(x) **2 )
+    return mean( (1 - x) **2, axis=-1 )  + 100 * mean( np.diff(x) **2, axis=-1 )
 
 #...............................................................................
+@vectorized
 def nesterov( x ):
     """ Nesterov's nonsmooth Chebyshev-Rosenbrock function, Overton 2011 variant 2 """
     x = np.asarray_chkfinite(x)
-    x0 = x[:-1]
-    x1 = x[1:]
-    return abs( 1 - x[0] ) / 4 \
-        + sum( abs( x1 - 2*abs(x0) + 1 ))
+    x0 = x[..., :-1]
+    x1 = x[..., 1:]
+    return abs( 1 - x[..., 0] ) / 4 \
+        + sum( abs( x1 - 2*abs(x0) + 1 ), axis=-1)
 
 #...............................................................................
+@vectorized
 def saddle( x ):
     x = np.asarray_chkfinite(x) - 1
-    return np.mean( np.diff( x **2 )) \
-        + .5 * np.mean( x **4 )
\ No newline at end of file
+    return np.mean( np.diff( x **2 ), axis=-1) \
+        + .5 * np.mean( x **4, axis=-1 )
\ No newline at end of file
@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+import numpy
+from solution import solution
+from stopping import asCriteria
+
+# Island model for GEA, MFO and SSA: the population is split into islands,
+# each evolved by the unmodified optimizer in its own process. Every `every`
+# iterations each island sends copies of its best individuals to its
+# neighbours and replaces its worst individuals with better arrivals. The
+# exchange is synchronous, so a run is reproducible for a given seed, but
+# only a handful of rows cross process boundaries per migration.
+
+TOPOLOGIES = ("ring", "full")
+
+
+def neighbours(island, islands, topology):
+    """ the islands `island` sends its emigrants to """
+    if topology == "ring":
+        return [(island + 1) % islands] if islands > 1 else []
+    if topology == "full":
+        return [other for other in range(islands) if other != island]
+    raise ValueError(f"unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+
+
+class Migration:
+    """
+    One island's end of the exchange, passed to the optimizer as `migration`.
+    `rate` is the fraction of the island's population sent per migration
+    (at least one individual). Messages are (sender, positions, fitness);
+    positions None means the sender has finished: it sends nothing more and
+    reads nothing more, so it goes to the islands it receives from as well.
+    """
+
+    def __init__(self, island, inboxes, topology="ring", every=10, rate=0.05):
+        islands = len(inboxes)
+        self.island = island
+        self.inboxes = inboxes
+        self.every = every
+        self.rate = rate
+        self.targets = neighbours(island, islands, topology)
+        self.sources = [other for other in range(islands) if island in neighbours(other, islands, topology)]
+        # messages that arrived ahead of their turn, per sender
+        self._queued = {other: deque() for other in range(islands)}
+
+    def due(self, iteration):
+        return self.every > 0 and bool(self.sources or self.targets) and iteration % self.every == 0
+
+    def exchange(self, population, fitness):
+        """ sends the best rows, then replaces the worst rows in place with better arrivals """
+        # targets that have finished read no more migrants; dropping them
+        # depends on timing, but only spares messages nobody would read
+        self._poll()
+        self.targets = [target for target in self.targets
+                        if not any(positions is None for _, positions, _ in self._queued[target])]
+
+        count = max(1, int(round(self.rate * len(fitness))))
+        best = numpy.argsort(fitness)[:count]
+        message = (self.island, population[best], fitness[best])
+        for target in self.targets:
+            self.inboxes[target].put(message)
+
+        arrivals = []
+        for sender in list(self.sources):
+            _, positions, values = self._receive(sender)
+            if positions is None:
+                self.sources.remove(sender)
+            else:
+                arrivals.append((positions, values))
+        if not arrivals:
+            return
+
+        positions = numpy.concatenate([positions for positions, _ in arrivals])
+        values = numpy.concatenate([values for _, values in arrivals])
+        order = numpy.argsort(values, kind="stable")
+        worst = numpy.argsort(fitness, kind="stable")[::-1][:len(order)]
+        order = order[:len(worst)]
+        better = values[order] < fitness[worst]
+        population[worst[better]] = positions[order[better]]
+        fitness[worst[better]] = values[order[better]]
+
+    def _receive(self, sender):
+        # one sender's messages arrive in the order it sent them
+        while not self._queued[sender]:
+            message = self.inboxes[self.island].get()
+            self._queued[message[0]].append(message)
+        return self._queued[sender].popleft()
+
+    def _poll(self):
+        # queues the messages that have already arrived, without waiting
+        while True:
+            try:
+                message = self.inboxes[self.island].get_nowait()
+            except queue.Empty:
+                return
+            self._queued[message[0]].append(message)
+
+    def close(self):
+        for other in set(self.targets) | set(self.sources):
+            self.inboxes[other].put((self.island, None, None))
+
+
+def _drain(inboxes):
+    """ discards whatever is waiting in `inboxes` """
+    for inbox in inboxes:
+        try:
+            while True:
+                inbox.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def _run_island(optimizer, island, inboxes, results, topology, every, rate, kwargs):
+    migration = Migration(island, inboxes, topology, every, rate)
+    try:
+        results.put((island, optimizer(migration=migration, **kwargs)))
+    except Exception as e:
+        results.put((island, e))
+    finally:
+        migration.close()
+
+
+def islandModel(optimizer, objf, lb, ub, dim, N, Max_iteration, islands=None, topology="ring",
+                every=10, rate=0.05, rng=None, **options):
+    """
+    Runs `optimizer` (GEA, MFO or SSA) as `islands` processes of about
+    N / islands individuals each (one per CPU by default). `options` are
+    passed on to every island, which draws from its own child of `rng`;
+    stopping criteria are shared out by island size, so the islands
+    together get the evaluation budget of one plain run. Returns one
+    solution: the best individual over all islands and the best-so-far
+    convergence curve across them.
+    """
+    islands = islands or os.cpu_count()
+    neighbours(0, islands, topology)
+    sizes = [N // islands + (island < N % islands) for island in range(islands)]
+    if min(sizes) < 2:
+        raise ValueError(f"{N} individuals are too few for {islands} islands")
+    streams = numpy.random.default_rng(rng).spawn(islands)
+    stopping = asCriteria(options.pop("stopping", None))
+
+    start_time = time.time()
+    inboxes = [multiprocessing.Queue() for _ in range(islands)]
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_run_island,
+            args=(optimizer, island, inboxes, results, topology, every, rate, dict(
+                options, objf=objf, lb=lb, ub=ub, dim=dim, N=sizes[island],
+                Max_iteration=Max_iteration, rng=streams[island],
+                stopping=[criterion.share(sizes[island] / N) for criterion in stopping],
+            )),
+        )
+        for island in range(islands)
+    ]
+    for process in processes:
+        process.start()
+    # drain the results before joining, a child exits only once its result is sent
+    finished = dict(results.get() for _ in processes)
+    # Every island has finished, so the migrants still on their way are
+    # unneeded; a child exits only once its messages are sent, which takes
+    # a reader once they fill the pipe
+    for process in processes:
+        while process.is_alive():
+            _drain(inboxes)
+            process.join(0.05)
+
+    for island in range(islands):
+        if isinstance(finished[island], Exception):
+            raise finished[island]
+    runs = [finished[island] for island in range(islands)]
+
+    # Islands that stopped early keep their final best for the remaining iterations
+    length = max(len(run.convergence) for run in runs)
+    curves = numpy.array([
+        numpy.concatenate((run.convergence, numpy.full(length - len(run.convergence), run.convergence[-1])))
+        for run in runs
+    ])
+    longest = max(runs, key=lambda run: run.stopIteration)
+    best = min(runs, key=lambda run: run.convergence[-1])
+
+    s = solution()
+    s.convergence = curves.min(axis=0)
+    s.stopReason = longest.stopReason
+    s.stopIteration = longest.stopIteration
+    s.optimizer = f"{best.optimizer}-islands"
+    s.bestIndividual = best.bestIndividual
+    s.objfname = objf.__name__
+    s.totalNoEvaluation = sum(run.totalNoEvaluation for run in runs)
+    s.startTime = start_time
+    s.endTime = time.time()
+    s.executionTime = s.endTime - start_time
+    return s
@@ -0,0 +1,185 @@
+import math
+import numpy
+
+try:
+    import numba  # optional: compiles the kernels below to machine code
+except ImportError:
+    numba = None
+
+# Compiled kernels for the loops NumPy cannot vectorize well: the perm and
+# powersum objectives, whose work grows with dim squared, the MFO spiral,
+# the SSA follower chain and the GEA flock update. Each is a plain loop,
+# compiled by Numba when the "numba" backend is selected, which needs Numba
+# installed; by default the callers keep their NumPy code and these loops
+# never run.
+# Compiled code is cached on disk next to this module (or in
+# NUMBA_CACHE_DIR), so a worker process loads it instead of compiling.
+#
+# The compiled loops round differently from NumPy's vectorized kernels, so
+# a seeded run agrees with its NumPy counterpart only up to rounding and
+# then drifts apart; compare campaigns within one backend. That, and no
+# measurable gain for the MFO spiral, is why the backend is opt-in.
+
+BACKENDS = ("numpy", "numba")
+
+backend = "numpy"
+
+
+def useBackend(name=None):
+    """ selects the kernel backend; None keeps the default, numpy """
+    global backend
+    if name is None:
+        name = "numpy"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown kernel backend {name!r}, expected one of {BACKENDS}")
+    if name == "numba" and numba is None:
+        raise ValueError("the numba kernel backend needs numba installed")
+    backend = name
+    return backend
+
+
+def compiled():
+    return backend == "numba"
+
+
+def _jit(f):
+    return numba.njit(cache=True)(f) if numba is not None else f
+
+
+@_jit
+def _perm(x, b, out):
+    rows, n = x.shape
+    # j**k + b depends on neither the row nor x
+    weights = numpy.empty((n, n))
+    for k in range(1, n + 1):
+        for j in range(1, n + 1):
+            weights[k - 1, j - 1] = j ** (k / n) + b
+    # (|x_j| / j)**(k/n) for k = 1..n as a running product of its first power
+    step = numpy.empty(n)
+    power = numpy.empty(n)
+    for r in range(rows):
+        for j in range(n):
+            step[j] = (abs(x[r, j]) / (j + 1)) ** (1 / n)
+            power[j] = 1.0
+        total = 0.0
+        for k in range(1, n + 1):
+            inner = 0.0
+            for j in range(n):
+                power[j] *= step[j]
+                inner += weights[k - 1, j] * (power[j] - 1)
+            inner /= n
+            total += inner * inner
+        out[r] = total / n
+
+
+@_jit
+def _powersum(x, b, out):
+    rows, n = x.shape
+    power = numpy.empty(n)
+    for r in range(rows):
+        for j in range(n):
+            power[j] = 1.0
+        s = 0.0
+        for k in range(1, n + 1):
+            total = 0.0
+            for j in range(n):
+                power[j] *= x[r, j]
+                total += power[j]
+            bk = b[min(k - 1, len(b) - 1)]
+            s += (total - bk) ** 2
+        out[r] = s
+
+
+@_jit
+def _moth_spiral(t, a, flames, moths, flame_no):
+    rows, dim = moths.shape
+    for i in range(rows):
+        flame = min(i, flame_no)
+        for j in range(dim):
+            spiral = t[i, j] * (a - 1) + 1
+            distance = abs(flames[i, j] - moths[i, j])
+            moths[i, j] = distance * math.exp(spiral) * math.cos(spiral * 2 * math.pi) + flames[flame, j]
+
+
+@_jit
+def _follow_chain(positions, first):
+    rows, dim = positions.shape
+    for i in range(first, rows):
+        for j in range(dim):
+            positions[i, j] = (positions[i - 1, j] + positions[i, j]) / 2
+
+
+@_jit
+def _flock_update(eagles, previous, R, towards_best, best, partners, lb, ub):
+    rows, dim = eagles.shape
+    previous[:] = eagles
+    for i in range(rows):
+        for j in range(dim):
+            target = best[j] if towards_best[i] else previous[partners[i], j]
+            position = previous[i, j] + R[i, j] * (target - previous[i, j])
+            eagles[i, j] = min(max(position, lb[j]), ub[j])
+
+
+def _rows(x):
+    """
+    x as a contiguous floating-point (rows, dim) array, and whether it was a
+    single position; integer positions become float64 as they do in NumPy
+    """
+    x = numpy.ascontiguousarray(x)
+    if x.dtype.kind != "f":
+        x = x.astype(numpy.float64)
+    return (x[None, :], True) if x.ndim == 1 else (x.reshape(-1, x.shape[-1]), False)
+
+
+def perm(x, b=.5):
+    """ the perm objective of functions.py for a position or a population """
+    rows, single = _rows(x)
+    out = numpy.empty(len(rows), dtype=rows.dtype)
+    _perm(rows, float(b), out)
+    return out[0] if single else out.reshape(x.shape[:-1])
+
+
+def powersum(x, b=(8, 18, 44, 114)):
+    """ the powersum objective of functions.py for a position or a population """
+    rows, single = _rows(x)
+    out = numpy.empty(len(rows), dtype=rows.dtype)
+    _powersum(rows, numpy.asarray(b, dtype=numpy.float64), out)
+    return out[0] if single else out.reshape(x.shape[:-1])
+
+
+def mothSpiral(t, a, flames, moths, flame_no):
+    """ MFO's Eq. (3.12)-(3.13) in place on every (N, dim) swarm of `moths`, from uniform draws `t` """
+    for run in numpy.ndindex(moths.shape[:-2]):
+        _moth_spiral(t[run], a, flames[run], moths[run], flame_no)
+
+
+def followChain(positions, first):
+    """ SSA's Eq. (3.4) in place on every (N, dim) chain of `positions` """
+    for chain in positions.reshape(-1, *positions.shape[-2:]):
+        _follow_chain(chain, first)
+
+
+def flockUpdate(eagles, previous, R, towards_best, best, partners, lb, ub):
+    """
+    GEA's synchronous move and clip in place on every (N, dim) flock of
+    `eagles`; `previous` is (N, dim) scratch space
+    """
+    for run in numpy.ndindex(eagles.shape[:-2]):
+        _flock_update(eagles[run], previous, R[run], towards_best[run], best[run], partners[run], lb, ub)
+
+
+def warmUp():
+    """
+    Compiles (or loads from the disk cache) every kernel for float64 and
+    float32, so processes forked afterwards start with them ready.
+    """
+    if not compiled():
+        return
+    for dtype in (numpy.float64, numpy.float32):
+        x = numpy.ones((2, 3), dtype=dtype)
+        perm(x)
+        powersum(x)
+        mothSpiral(x.copy(), -1.5, x.copy(), x.copy(), 1)
+        followChain(x.copy(), 1)
+        flockUpdate(x.copy(), x.copy(), x.copy(), numpy.zeros(2, dtype=bool), x[0].copy(),
+                    numpy.zeros(2, dtype=numpy.int64), x[0].copy(), x[0].copy())
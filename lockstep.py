@@ -0,0 +1,323 @@
+import time
+import numpy
+from solution import solution
+from functions import evaluatePopulation, precisionTypes
+from stopping import asCriteria, stopReason
+from progress import ProgressEvent
+from driver import Optimizer
+from GEA import _move_flock
+from MFO import _flame_schedule, _select_flames, _move_moths
+from SSA import _leader_coefficient, _move_salps
+
+# Lockstep engine: R independent runs of one algorithm advance together, their
+# populations stacked into one (R, N, dim) array, so every iteration is one
+# set of NumPy operations for all runs instead of R interpreted loops. Each
+# run keeps its own random stream and draws from it in the same order as the
+# stand-alone optimizer, and the moves are the stand-alone optimizers' own,
+# applied over the leading run axis, so a run gives bit-for-bit the result
+# it gives on its own. Runs that meet their stopping criteria drop out of
+# the arrays.
+#
+# GEA steps its flock synchronously and MFO updates its moths vectorized;
+# the asynchronous and loop modes are inherently per run and have no
+# lockstep form. Neither has island migration, which trades individuals
+# between the parts of a single run.
+
+
+def _uniform(rngs, N, dim, lb_vec, ub_vec, dtype):
+    """ initial (R, N, dim) positions, drawn column by column like the optimizers """
+    positions = numpy.zeros((len(rngs), N, dim), dtype=dtype)
+    for run, rng in enumerate(rngs):
+        for i in range(dim):
+            positions[run, :, i] = rng.random(N, dtype=dtype) * (ub_vec[i] - lb_vec[i]) + lb_vec[i]
+    return positions
+
+
+def _random(rngs, out):
+    """ fills out[r] from the stream of run r """
+    for rng, block in zip(rngs, out):
+        rng.random(dtype=out.dtype, out=block)
+    return out
+
+
+class LockstepOptimizer(Optimizer):
+    """
+    Ask/tell for R runs at once: ask() returns the (R, N, dim) candidates
+    and tell() takes their (R, N) fitness, True once an iteration has
+    completed. `best`, `bestIndividual`, `evaluations` and `convergence`
+    have a leading run axis. A `budget` of seconds is shared by the whole
+    batch, whose runs all follow its schedule.
+    """
+
+    # attributes with a leading run axis, compacted when runs drop out
+    _runs = ()
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, rngs, precision="double", budget=None):
+        self.rngs = [numpy.random.default_rng(rng) for rng in rngs]
+        self.dtype, self.fitness_dtype = precisionTypes(precision)
+        self.dim = dim
+        self.N = N
+        if not isinstance(lb, list):
+            lb = [lb] * dim
+        if not isinstance(ub, list):
+            ub = [ub] * dim
+        self.lb_vec = numpy.array(lb, dtype=self.dtype)
+        self.ub_vec = numpy.array(ub, dtype=self.dtype)
+        self.Convergence_curve = numpy.tile(self._start(Max_iteration, budget, self.fitness_dtype), (len(self.rngs), 1))
+        self.iteration = 1
+        self.evaluations = numpy.zeros(len(self.rngs), dtype=numpy.int64)  # per run
+
+    @property
+    def convergence(self):
+        return self.Convergence_curve
+
+    def keep(self, runs):
+        """ keeps only the runs at indices `runs` """
+        for attribute in self._runs + ("Convergence_curve", "evaluations"):
+            setattr(self, attribute, getattr(self, attribute)[runs])
+        self.rngs = [self.rngs[run] for run in runs]
+
+
+class LockstepGEA(LockstepOptimizer):
+
+    name = "GEA"
+    _runs = ("Eagles", "Fitness", "BestEagle", "BestFitness", "R", "towards_best", "partners")
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, rngs, precision="double", budget=None):
+        super().__init__(lb, ub, dim, N, Max_iteration, rngs, precision, budget)
+        runs = len(self.rngs)
+        self.Eagles = _uniform(self.rngs, N, dim, self.lb_vec, self.ub_vec, self.dtype)
+        self.Fitness = numpy.full((runs, N), float("inf"), dtype=self.fitness_dtype)
+        self.BestFitness = numpy.full(runs, float("inf"), dtype=self.fitness_dtype)
+        self.BestEagle = numpy.zeros((runs, dim), dtype=self.dtype)
+        self.R = numpy.zeros((runs, N, dim), dtype=self.dtype)
+        self.towards_best = numpy.zeros((runs, N), dtype=bool)
+        self.partners = numpy.zeros((runs, N), dtype=numpy.int64)
+        self._previous = numpy.empty((N, dim), dtype=self.dtype)  # scratch space of the compiled flock update
+        self._initialized = False
+
+    @property
+    def best(self):
+        return self.BestFitness
+
+    @property
+    def bestIndividual(self):
+        return self.BestEagle
+
+    def ask(self):
+        if not self._initialized:
+            return self.Eagles
+        N = self.N
+        for run, rng in enumerate(self.rngs):
+            rng.random(dtype=self.dtype, out=self.R[run])
+            self.towards_best[run] = rng.random(N) < 0.5
+            self.partners[run] = rng.integers(0, N, N)
+        _move_flock(self.Eagles, self.R, self.towards_best, self.BestEagle, self.partners,
+                    self.lb_vec, self.ub_vec, self._previous)
+        return self.Eagles
+
+    def tell(self, fitness):
+        self.Fitness[:] = fitness
+        self.evaluations += fitness.shape[1]
+        runs = numpy.arange(len(self.rngs))
+        best = numpy.argmin(self.Fitness, axis=1)
+        if not self._initialized:
+            self.BestFitness[:] = self.Fitness[runs, best]
+            self.BestEagle[:] = self.Eagles[runs, best]
+            self._initialized = True
+            return False
+
+        # Update best position and fitness of every run
+        improved = self.Fitness[runs, best] < self.BestFitness
+        self.BestFitness[improved] = self.Fitness[runs, best][improved]
+        self.BestEagle[improved] = self.Eagles[runs[improved], best[improved]]
+
+        self._log_best(self.BestFitness)
+        return True
+
+
+class LockstepMFO(LockstepOptimizer):
+
+    name = "MFO"
+    _runs = ("Moth_pos", "Moth_fitness", "best_flames", "best_flame_fitness",
+             "double_population", "double_fitness", "t", "distance_to_flame", "spiral")
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, rngs, precision="double", budget=None):
+        super().__init__(lb, ub, dim, N, Max_iteration, rngs, precision, budget)
+        runs = len(self.rngs)
+        dtype, fitness_dtype = self.dtype, self.fitness_dtype
+        self.Moth_pos = _uniform(self.rngs, N, dim, self.lb_vec, self.ub_vec, dtype)
+        self.Moth_fitness = numpy.full((runs, N), float("inf"), dtype=fitness_dtype)
+        self.best_flames = numpy.zeros((runs, N, dim), dtype=dtype)
+        self.best_flame_fitness = numpy.zeros((runs, N), dtype=fitness_dtype)
+        # the 2N candidates of every run: its moths followed by its flames
+        self.double_population = numpy.zeros((runs, 2 * N, dim), dtype=dtype)
+        self.double_fitness = numpy.zeros((runs, 2 * N), dtype=fitness_dtype)
+        self.t = numpy.zeros((runs, N, dim), dtype=dtype)
+        self.distance_to_flame = numpy.zeros((runs, N, dim), dtype=dtype)
+        self.spiral = numpy.zeros((runs, N, dim), dtype=dtype)
+        self.moth_index = numpy.arange(N)
+        self.flame_index = numpy.zeros(N, dtype=self.moth_index.dtype)
+
+    @property
+    def best(self):
+        return self.best_flame_fitness[:, 0]
+
+    @property
+    def bestIndividual(self):
+        return self.best_flames[:, 0, :]
+
+    def ask(self):
+        numpy.clip(self.Moth_pos, self.lb_vec, self.ub_vec, out=self.Moth_pos)
+        return self.Moth_pos
+
+    def tell(self, fitness):
+        Flame_no, a = _flame_schedule(self)
+        self.Moth_fitness[:] = fitness
+        self.evaluations += fitness.shape[1]
+
+        _select_flames(self.Moth_pos, self.Moth_fitness, self.best_flames, self.best_flame_fitness,
+                       self.double_population, self.double_fitness, self.iteration == 1)
+        _move_moths(_random(self.rngs, self.t), a, Flame_no, self.best_flames, self.Moth_pos,
+                    self.distance_to_flame, self.spiral, self.moth_index, self.flame_index)
+
+        self._log_best(self.best_flame_fitness[:, 0])
+        return True
+
+
+class LockstepSSA(LockstepOptimizer):
+
+    name = "SSA"
+    _runs = ("SalpPositions", "SalpFitness", "FoodPosition", "FoodFitness", "c2", "c3")
+
+    def __init__(self, lb, ub, dim, N, Max_iteration, rngs, precision="double", budget=None):
+        super().__init__(lb, ub, dim, N, Max_iteration, rngs, precision, budget)
+        runs = len(self.rngs)
+        # salps 0..leaders-1 (i < N / 2) lead, the rest follow in a chain
+        self.leaders = (N + 1) // 2
+        self.SalpPositions = _uniform(self.rngs, N, dim, self.lb_vec, self.ub_vec, self.dtype)
+        self.SalpFitness = numpy.full((runs, N), float("inf"), dtype=self.fitness_dtype)
+        self.FoodPosition = numpy.zeros((runs, dim), dtype=self.dtype)
+        self.FoodFitness = numpy.full(runs, float("inf"), dtype=self.fitness_dtype)
+        self.c2 = numpy.zeros((runs, self.leaders, dim), dtype=self.dtype)
+        self.c3 = numpy.zeros((runs, self.leaders, dim), dtype=self.dtype)
+        self._initialized = False
+
+    @property
+    def best(self):
+        return self.FoodFitness
+
+    @property
+    def bestIndividual(self):
+        return self.FoodPosition
+
+    def ask(self):
+        if not self._initialized:
+            return self.SalpPositions
+        c1 = _leader_coefficient(self)
+        for run, rng in enumerate(self.rngs):
+            rng.random(dtype=self.dtype, out=self.c2[run])
+            rng.random(dtype=self.dtype, out=self.c3[run])
+        _move_salps(self.SalpPositions, self.FoodPosition, c1, self.c2, self.c3, self.leaders,
+                    self.lb_vec, self.ub_vec)
+        return self.SalpPositions
+
+    def tell(self, fitness):
+        self.SalpFitness[:] = fitness
+        self.evaluations += fitness.shape[1]
+        runs = numpy.arange(len(self.rngs))
+        if not self._initialized:
+            first = numpy.argsort(self.SalpFitness, axis=1)[:, 0]
+            self.FoodPosition[:] = self.SalpPositions[runs, first]
+            self.FoodFitness[:] = self.SalpFitness[runs, first]
+            self._initialized = True
+            return False
+
+        best = numpy.argmin(self.SalpFitness, axis=1)
+        improved = self.SalpFitness[runs, best] < self.FoodFitness
+        self.FoodPosition[improved] = self.SalpPositions[runs[improved], best[improved]]
+        self.FoodFitness[improved] = self.SalpFitness[runs, best][improved]
+
+        self._log_best(self.FoodFitness)
+        return True
+
+
+LOCKSTEP = {"GEA": LockstepGEA, "MFO": LockstepMFO, "SSA": LockstepSSA}
+
+
+def _evaluate(objfs, population, dtype):
+    """ (R, N) fitness, one batch per distinct objective """
+    groups = {}
+    for run, objf in enumerate(objfs):
+        groups.setdefault(objf, []).append(run)
+    fitness = numpy.empty(population.shape[:2], dtype=dtype)
+    for objf, runs in groups.items():
+        rows = population[runs].reshape(-1, population.shape[-1])
+        fitness[runs] = evaluatePopulation(objf, rows, dtype).reshape(len(runs), -1)
+    return fitness
+
+
+def lockstep(algorithm_name, objfs, lb, ub, dim, N, Max_iteration, rngs, stopping=None, progress=None, precision="double", budget=None):
+    """
+    Runs `algorithm_name` ("GEA", "MFO" or "SSA") once per entry of `rngs`
+    (seeds or Generators), run r minimizing objfs[r] or a single `objfs`
+    shared by all, and returns their solutions in that order. Stopping
+    criteria apply to each run on its own, a time `budget` to the batch as
+    a whole; progress events report the best fitness and the evaluations
+    over the runs still going.
+    """
+    if callable(objfs):
+        objfs = [objfs] * len(rngs)
+    if len(objfs) != len(rngs):
+        raise ValueError(f"{len(objfs)} objectives for {len(rngs)} runs")
+    optimizer = LOCKSTEP[algorithm_name](lb, ub, dim, N, Max_iteration, rngs, precision, budget)
+    stopping = asCriteria(stopping)
+    start_time = time.time()
+
+    solutions = [None] * len(objfs)
+    active = list(range(len(objfs)))  # run of each row of the optimizer's arrays
+
+    def finish(row, reason):
+        s = solution()
+        s.convergence = optimizer.convergence[row, :optimizer.iteration].copy()
+        s.stopReason = reason
+        s.stopIteration = optimizer.iteration - 1
+        s.optimizer = optimizer.name
+        s.bestIndividual = optimizer.bestIndividual[row].copy()
+        s.objfname = objfs[active[row]].__name__
+        s.totalNoEvaluation = int(optimizer.evaluations[row])
+        s.startTime = start_time
+        s.endTime = time.time()
+        s.executionTime = s.endTime - start_time
+        solutions[active[row]] = s
+
+    while active and optimizer.running():
+        population = optimizer.ask()
+        fitness = _evaluate([objfs[run] for run in active], population, optimizer.fitness_dtype)
+        if not optimizer.tell(fitness):
+            continue
+        Iteration = optimizer.iteration - 1
+
+        if progress is not None:
+            progress.update(
+                ProgressEvent(optimizer.name, f"{len(active)} runs", Iteration, optimizer.best.min(),
+                              int(optimizer.evaluations.sum()), time.time() - start_time)
+            )
+
+        reasons = [None] * len(active)
+        if stopping:
+            reasons = [stopReason(stopping, Iteration, optimizer.convergence[row], start_time, optimizer.evaluations[row])
+                       for row in range(len(active))]
+        if optimizer.budgetSpent():
+            reasons = [reason or "time_budget" for reason in reasons]
+        if any(reasons):
+            for row, reason in enumerate(reasons):
+                if reason:
+                    finish(row, reason)
+            keep = [row for row, reason in enumerate(reasons) if not reason]
+            optimizer.keep(keep)
+            active = [active[row] for row in keep]
+
+    for row in range(len(active)):
+        finish(row, "max_iteration")
+    return solutions
@@ -0,0 +1,130 @@
+import os
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from functions import evaluatePopulation
+
+# Worker-side state, set once by the pool initializer
+_objf = None
+_attached = {}
+
+
+def _init_worker(objf):
+    global _objf
+    _objf = objf
+
+
+def _attach(name):
+    block = _attached.get(name)
+    if block is None:
+        block = shared_memory.SharedMemory(name=name)
+        _attached[name] = block
+    return block
+
+
+def _release_stale(keep):
+    for name in list(_attached):
+        if name not in keep:
+            _attached.pop(name).close()
+
+
+def _evaluate_shard(population_name, fitness_name, rows, dim, dtype, start, stop):
+    _release_stale((population_name, fitness_name))
+    population = numpy.ndarray((rows, dim), dtype=dtype, buffer=_attach(population_name).buf)
+    fitness = numpy.ndarray(rows, dtype=dtype, buffer=_attach(fitness_name).buf)
+    fitness[start:stop] = evaluatePopulation(_objf, population[start:stop, :], dtype)
+
+
+class SharedMemoryEvaluator:
+    """
+    Objective wrapper that shards each population across a persistent
+    process pool. The population and its fitness live in shared memory, so
+    a call costs one copy in and one copy out; workers only receive the
+    block names and their row range.
+
+    Pass an instance as `objf` to GEA, MFO or SSA. Single positions (the
+    asynchronous GEA mode) are evaluated in the calling process. The
+    evaluator owns processes and shared memory, so create it inside the
+    process that runs the optimizer and close it (or use `with`) afterwards.
+    Populations are evaluated in their own floating-point dtype.
+    """
+
+    vectorized = True
+
+    def __init__(self, objf, workers=None, shards=None):
+        self.objf = objf
+        self.__name__ = objf.__name__
+        self.workers = workers or os.cpu_count()
+        self.shards = shards or self.workers
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(objf,)
+        )
+        self._population_block = None
+        self._fitness_block = None
+        self._shape = None
+
+    def _allocate(self, rows, dim, dtype):
+        if self._shape == (rows, dim, dtype):
+            return
+        self._free()
+        itemsize = numpy.dtype(dtype).itemsize
+        self._population_block = shared_memory.SharedMemory(create=True, size=rows * dim * itemsize)
+        self._fitness_block = shared_memory.SharedMemory(create=True, size=rows * itemsize)
+        self._population = numpy.ndarray((rows, dim), dtype=dtype, buffer=self._population_block.buf)
+        self._fitness = numpy.ndarray(rows, dtype=dtype, buffer=self._fitness_block.buf)
+        self._shape = (rows, dim, dtype)
+
+    def _free(self):
+        for block in (self._population_block, self._fitness_block):
+            if block is not None:
+                block.close()
+                block.unlink()
+        self._population_block = self._fitness_block = None
+        self._population = self._fitness = None
+        self._shape = None
+
+    def __call__(self, x):
+        x = numpy.asarray(x)
+        if not numpy.issubdtype(x.dtype, numpy.floating):
+            x = x.astype(float)
+        if x.ndim == 1:
+            return self.objf(x)
+
+        batch_shape = x.shape[:-1]
+        dim = x.shape[-1]
+        rows = int(numpy.prod(batch_shape))
+        if rows == 1:
+            # one candidate at a time (asynchronous GEA) is not worth a round trip
+            return numpy.asarray(evaluatePopulation(self.objf, x.reshape(1, dim), x.dtype)).reshape(batch_shape)
+        dtype = x.dtype.str
+        self._allocate(rows, dim, dtype)
+        self._population[:] = x.reshape(rows, dim)
+
+        bounds = numpy.linspace(0, rows, min(self.shards, rows) + 1).astype(int)
+        tasks = [
+            self._pool.submit(
+                _evaluate_shard,
+                self._population_block.name,
+                self._fitness_block.name,
+                rows,
+                dim,
+                dtype,
+                start,
+                stop,
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for task in tasks:
+            task.result()
+
+        return self._fitness.copy().reshape(batch_shape)
+
+    def close(self):
+        self._pool.shutdown()
+        self._free()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,122 @@
+import shutil
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# Progress reporting for GEA, MFO and SSA. Optimizers hand a ProgressEvent
+# to their reporter after every iteration; the reporter decides what, if
+# anything, to do with it. Passing no reporter keeps a run silent.
+
+ProgressEvent = namedtuple(
+    "ProgressEvent", ["optimizer", "benchmark", "iteration", "best", "evaluations", "elapsed"]
+)
+
+
+class Progress:
+    """ silent reporter, and the interface the others implement """
+
+    def update(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleProgress(Progress):
+    """ prints the latest event at most once every `interval` seconds """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = float("-inf")
+
+    def update(self, event):
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            print(f"{event.optimizer}: At iteration {event.iteration}, the best fitness is {event.best}")
+
+
+class QueueProgress(Progress):
+    """
+    Keeps the latest event of a task in-process and forwards it to `queue`
+    at most once every `interval` seconds; closing sends what is left and
+    marks the task finished.
+    """
+
+    def __init__(self, queue, task, interval=1.0):
+        self.queue = queue
+        self.task = task
+        self.interval = interval
+        self._pending = None
+        self._last = float("-inf")
+
+    def update(self, event):
+        self._pending = event
+        if time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending is not None:
+            self.queue.put((self.task, self._pending))
+            self._pending = None
+            self._last = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.queue.put((self.task, None))
+
+
+class CampaignMonitor:
+    """
+    Collects QueueProgress messages from every task of a campaign and keeps
+    one status line up to date: elapsed time, finished tasks, and the
+    iteration and best fitness of each running task.
+    """
+
+    def __init__(self, queue, total, interval=1.0, stream=None):
+        self.queue = queue
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.running = {}
+        self.finished = 0
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._start = time.monotonic()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join()
+        self._render()
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def _run(self):
+        last_render = float("-inf")
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            task, event = message
+            if event is None:
+                self.running.pop(task, None)
+                self.finished += 1
+            else:
+                self.running[task] = event
+            if time.monotonic() - last_render >= self.interval:
+                self._render()
+                last_render = time.monotonic()
+
+    def _render(self):
+        elapsed = time.monotonic() - self._start
+        parts = [f"[{elapsed:7.1f}s] {self.finished}/{self.total} done"]
+        for event in sorted(self.running.values(), key=lambda e: (e.optimizer, e.benchmark)):
+            parts.append(f"{event.optimizer}/{event.benchmark} it {event.iteration} best {event.best:.6g}")
+        width = shutil.get_terminal_size().columns - 1
+        self.stream.write("\r" + " | ".join(parts)[:width].ljust(width))
+        self.stream.flush()
@@ -0,0 +1,285 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+# One SQLite database for every campaign the runners produce. A campaign is
+# one invocation of a runner; its tasks are the (algorithm, benchmark) runs
+# and each task keeps its full convergence curve. Runners write a campaign
+# in a single transaction; the visualization scripts query only the rows
+# they plot.
+
+RESULTS_DB = "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    runner TEXT NOT NULL,
+    started REAL,
+    total_time REAL,
+    workers INTEGER,
+    processes INTEGER,
+    predicted_makespan REAL,
+    achieved_makespan REAL,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(id),
+    algorithm TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    best_fitness REAL,
+    execution_time REAL,
+    pid INTEGER,
+    iterations INTEGER,
+    stop_reason TEXT,
+    error TEXT,
+    seed_index INTEGER,
+    cache_hits INTEGER,
+    cache_misses INTEGER,
+    evaluations INTEGER,
+    evaluations_per_second REAL
+);
+CREATE TABLE IF NOT EXISTS convergence (
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    iteration INTEGER NOT NULL,
+    fitness REAL,
+    PRIMARY KEY (task_id, iteration)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS campaigns_by_runner ON campaigns(runner, id);
+CREATE INDEX IF NOT EXISTS tasks_by_campaign ON tasks(campaign_id);
+CREATE INDEX IF NOT EXISTS tasks_by_key ON tasks(algorithm, benchmark);
+"""
+
+# Columns added to the schema later, added to databases created before them
+ADDED_COLUMNS = {
+    "tasks": [("seed_index", "INTEGER"), ("cache_hits", "INTEGER"), ("cache_misses", "INTEGER"),
+              ("evaluations", "INTEGER"), ("evaluations_per_second", "REAL")],
+}
+
+# Result files written by the runners before the store existed
+LEGACY_FILES = {
+    "parallel": "optimization_results_parallel.csv",
+    "single": "optimization_results_single.csv",
+}
+LEGACY_SCALABILITY_FILE = "scalability_data.csv"
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DB):
+        created = not os.path.exists(path)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._addColumns()
+        if created:
+            self.importLegacyResults()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _addColumns(self):
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for name, kind in columns:
+                if name not in existing:
+                    with self.connection:
+                        self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+    def recordCampaign(self, runner, results, total_time, workers=None, processes=None,
+                       parameters=None, predicted_makespan=None, achieved_makespan=None,
+                       started=None):
+        """
+        Stores a finished campaign and returns its id. `results` are the
+        task dicts returned by the runners; a "convergence" entry, when
+        present, is stored per iteration.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO campaigns (runner, started, total_time, workers, processes,"
+                " predicted_makespan, achieved_makespan, parameters) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (runner, started if started is not None else time.time(), total_time, workers,
+                 processes, predicted_makespan, achieved_makespan,
+                 json.dumps(parameters) if parameters is not None else None),
+            )
+            campaign_id = cursor.lastrowid
+            for result in results:
+                cursor = self.connection.execute(
+                    "INSERT INTO tasks (campaign_id, algorithm, benchmark, best_fitness, execution_time,"
+                    " pid, iterations, stop_reason, error, seed_index, cache_hits, cache_misses,"
+                    " evaluations, evaluations_per_second)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (campaign_id, result["algorithm"], result["benchmark"],
+                     _real(result.get("best_fitness")), _real(result.get("execution_time")),
+                     result.get("pid"), result.get("iterations"), result.get("stop_reason"),
+                     result.get("error"), result.get("seed_index"), result.get("cache_hits"),
+                     result.get("cache_misses"), result.get("evaluations"),
+                     _real(result.get("evaluations_per_second"))),
+                )
+                curve = result.get("convergence")
+                if curve is not None:
+                    self.connection.executemany(
+                        "INSERT INTO convergence (task_id, iteration, fitness) VALUES (?, ?, ?)",
+                        ((cursor.lastrowid, iteration, float(fitness)) for iteration, fitness in enumerate(curve)),
+                    )
+        return campaign_id
+
+    def latestCampaign(self, runner):
+        row = self.connection.execute(
+            "SELECT MAX(id) FROM campaigns WHERE runner = ?", (runner,)
+        ).fetchone()
+        return row[0]
+
+    def latestTasks(self, runner):
+        """
+        (columns, rows) for the tasks of the runner's most recent campaign,
+        with the column names the result CSVs used
+        """
+        cursor = self.connection.execute(
+            'SELECT algorithm AS "Algorithm", benchmark AS "Benchmark",'
+            ' best_fitness AS "Best Fitness", execution_time AS "Execution Time (s)",'
+            ' evaluations AS "Evaluations", evaluations_per_second AS "Evaluations/s",'
+            ' pid AS "PID", iterations AS "Iterations", stop_reason AS "Stop Reason",'
+            ' seed_index AS "Seed Index", id AS "Task"'
+            " FROM tasks WHERE campaign_id = ? ORDER BY id",
+            (self.latestCampaign(runner),),
+        )
+        return [column[0] for column in cursor.description], cursor.fetchall()
+
+    def convergence(self, task_id):
+        rows = self.connection.execute(
+            "SELECT fitness FROM convergence WHERE task_id = ? ORDER BY iteration", (task_id,)
+        ).fetchall()
+        return [fitness for (fitness,) in rows]
+
+    def campaignParameters(self, campaign_id):
+        row = self.connection.execute(
+            "SELECT parameters FROM campaigns WHERE id = ?", (campaign_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def taskHistory(self, parameters=None, workers=None):
+        """
+        mean execution time per (algorithm, benchmark) over all successful
+        tasks, only those of campaigns that recorded every one of
+        `parameters` with the same value and, when given, ran on `workers`
+        """
+        query = (
+            "SELECT t.algorithm, t.benchmark, AVG(t.execution_time)"
+            " FROM tasks t JOIN campaigns c ON t.campaign_id = c.id"
+            " WHERE t.error IS NULL AND t.execution_time IS NOT NULL"
+        )
+        arguments = []
+        for key, value in (parameters or {}).items():
+            query += f" AND json_extract(c.parameters, '$.{key}') IS ?"
+            arguments.append(value)
+        if workers is not None:
+            query += " AND c.workers = ?"
+            arguments.append(workers)
+        rows = self.connection.execute(query + " GROUP BY t.algorithm, t.benchmark", arguments).fetchall()
+        return {(algorithm, benchmark): seconds for algorithm, benchmark, seconds in rows}
+
+    def scalability(self, runner="select_cores", sweep=None, backend=None):
+        """
+        (workers, total_time) of the campaigns of `runner`, by worker count;
+        only those of one sweep when `sweep` is given and of one executor
+        backend when `backend` is
+        """
+        query = "SELECT workers, total_time FROM campaigns WHERE runner = ? AND workers IS NOT NULL"
+        arguments = [runner]
+        if sweep is not None:
+            query += " AND json_extract(parameters, '$.sweep') = ?"
+            arguments.append(sweep)
+        if backend is not None:
+            query += " AND json_extract(parameters, '$.backend') = ?"
+            arguments.append(backend)
+        return self.connection.execute(query + " ORDER BY workers, id", arguments).fetchall()
+
+    def throughput(self, runner, sweep=None):
+        """
+        (backend, workers, threads, evaluations per second of makespan) of
+        every campaign of `runner` that recorded its backend, only those of
+        one sweep when `sweep` is given. Tasks recorded before evaluations
+        were counted are taken to evaluate N individuals per iteration plus
+        the initial population.
+        """
+        query = (
+            "SELECT json_extract(c.parameters, '$.backend'), c.workers, json_extract(c.parameters, '$.threads'),"
+            " SUM(COALESCE(t.evaluations, (t.iterations + 1) * json_extract(c.parameters, '$.N')))"
+            " / c.achieved_makespan"
+            " FROM campaigns c JOIN tasks t ON t.campaign_id = c.id"
+            " WHERE c.runner = ? AND json_extract(c.parameters, '$.backend') IS NOT NULL"
+            " AND t.error IS NULL AND c.achieved_makespan > 0"
+        )
+        arguments = [runner]
+        if sweep is not None:
+            query += " AND json_extract(c.parameters, '$.sweep') = ?"
+            arguments.append(sweep)
+        return self.connection.execute(query + " GROUP BY c.id ORDER BY c.id", arguments).fetchall()
+
+    def latestSweep(self, runner="select_cores"):
+        """ id of the most recent sweep, or None if there has been none """
+        row = self.connection.execute(
+            "SELECT MAX(json_extract(parameters, '$.sweep')) FROM campaigns WHERE runner = ?", (runner,)
+        ).fetchone()
+        return row[0]
+
+    def importLegacyResults(self):
+        """ loads the CSV results written before the store into campaigns """
+        for runner, path in LEGACY_FILES.items():
+            if not os.path.isfile(path):
+                continue
+            results, footer = [], {}
+            with open(path, newline="") as file:
+                for row in csv.DictReader(file):
+                    if row.get("Best Fitness") is None:  # "Total Time (s): ", 1682.43
+                        footer[row["Algorithm"].strip().rstrip(":").strip()] = row["Benchmark"]
+                        continue
+                    fitness = _real(row["Best Fitness"])
+                    results.append({
+                        "algorithm": row["Algorithm"],
+                        "benchmark": row["Benchmark"],
+                        "best_fitness": fitness,
+                        "execution_time": _real(row["Execution Time (s)"]),
+                        "pid": int(row["PID"]),
+                        "error": "Error" if fitness is None else None,
+                    })
+            self.recordCampaign(
+                runner,
+                results,
+                total_time=_real(footer.get("Total Time (s)")),
+                processes=int(footer["Number of CPU Processes Used"]) if "Number of CPU Processes Used" in footer else None,
+                started=os.path.getmtime(path),
+            )
+        if os.path.isfile(LEGACY_SCALABILITY_FILE):
+            with open(LEGACY_SCALABILITY_FILE, newline="") as file:
+                for row in csv.DictReader(file):
+                    self.recordCampaign(
+                        "select_cores", [], total_time=float(row["Execution Time (s)"]),
+                        workers=int(row["Cores"]), started=os.path.getmtime(LEGACY_SCALABILITY_FILE),
+                    )
+
+
+def cacheColumns(cache):
+    """
+    The cache columns of a task run through `cache`, an EvaluationCache or
+    None: its hits, and its misses, the positions the objective actually
+    evaluated. `evaluations` still counts every position the run scored,
+    as its solution and an EvaluationBudget do.
+    """
+    if cache is None:
+        return {}
+    return {"cache_hits": cache.hits, "cache_misses": cache.misses}
+
+
+def _real(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
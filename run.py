@@ -1,12 +1,23 @@
 import time
-import csv
+import functools
+import numpy
 import os  # For getting process ID
-from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import Manager
 from SSA import SSA
 from MFO import MFO
 from GEA import GEA
 from functions import selectFunction
+from parallel_evaluation import SharedMemoryEvaluator
+from islands import islandModel
+from evaluation_cache import EvaluationCache
+from scheduler import planCampaign, splitBudget
+from checkpoint import taskCheckpoint, loadTaskResult, saveTaskResult, clearCampaign
+from stopping import RelativeImprovement
+from results_store import ResultsStore, cacheColumns
+from progress import QueueProgress, CampaignMonitor
+from seeding import campaignSeeds
+import kernels
+from executors import runTasks, campaignChannels, nativeThreadBudget
+from scalability_analysis import throughputReport
 
 # Benchmark function indices and algorithms
 benchmark_functions = [0, 1, 2, 4, 7, 8, 9, 10, 13]  # Indices of functions in selectFunction
@@ -21,10 +32,45 @@ lb = -100         # Lower bound of search space
 ub = 100          # Upper bound of search space
 dim = 30          # Dimensionality of the problem
 N = 5000          # Population size
-Max_iteration = 1000  # Maximum number of iterations
+Max_iteration = 1000  # Maximum number of iterations, None for none under a time budget
+time_budget = None  # seconds for the whole campaign, shared equally by its tasks; None runs on Max_iteration
+eval_workers = 1  # >1 shards every population evaluation across a shared-memory pool
+islands = 1  # >1 splits every population into islands on separate processes
+migration_topology = "ring"  # islands send migrants to the next island ("ring") or to all ("full")
+migration_every = 10  # iterations between migrations
+migration_rate = 0.05  # fraction of an island sent per migration
+schedule_source = "history"  # task cost estimates: "history" (past campaigns) or "calibrate"
+checkpoint_dir = "checkpoints"  # snapshots and finished tasks of an interrupted campaign
+checkpoint_every = 50  # iterations between snapshots, 0 disables them
+stopping = [RelativeImprovement(window=100, threshold=1e-8)]  # early termination, [] runs every iteration
+show_progress = True  # live campaign status line; False keeps the campaign silent
+root_seed = 2024  # every task's random stream derives from it, None draws fresh entropy
+precision = "double"  # "single" float32 throughout, or "mixed" float32 positions with float64 fitness
+backend = "process"  # run tasks as "process"es, "thread"s, or "hybrid" threads inside processes
+threads_per_process = 2  # tasks sharing one worker process under the hybrid backend
+cache_size = 0  # >0 remembers the fitness of up to this many positions per task
+cache_resolution = None  # grid cell size cached positions are matched by, which changes the results; None matches exactly and keeps them
+kernel_backend = "numpy"  # "numba" opts into the compiled kernels, which need numba and round differently
+gea_synchronous = False  # GEA moves one eagle at a time as originally (False) or the whole flock at once (True)
+
+# Settings a snapshot or finished task must have been saved with to be reused
+def checkpoint_parameters():
+    return {
+        "lb": lb, "ub": ub, "dim": dim, "N": N, "Max_iteration": Max_iteration, "time_budget": time_budget,
+        "islands": islands, "migration_topology": migration_topology, "migration_every": migration_every,
+        "migration_rate": migration_rate, "root_seed": root_seed, "precision": precision,
+        "cache_resolution": cache_resolution, "gea_synchronous": gea_synchronous,
+        "stopping": [[type(criterion).__name__, vars(criterion)] for criterion in stopping],
+    }
+
+# The algorithm with this runner's settings applied
+def configured(algorithm_name):
+    if algorithm_name == "GEA":
+        return functools.partial(algorithms[algorithm_name], synchronous=gea_synchronous)
+    return algorithms[algorithm_name]
 
 # Wrapper function to run a single algorithm on a single benchmark function
-def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids):
+def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids, seed_index, seed, progress_queue=None, budget=None):
     try:
         # Start timing for this specific task
         start_time = time.time()
@@ -32,31 +78,92 @@ def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids):
         # Select the objective function
         objf = selectFunction(objf_index)
 
-        # Run the algorithm
-        result = algorithm(
-            objf=objf,
-            lb=lb,
-            ub=ub,
-            dim=dim,
-            N=N,
-            Max_iteration=Max_iteration,
-        )
+        # Optionally shard each population evaluation across a worker pool;
+        # islands already spread the evaluations over processes
+        evaluator = None
+        if eval_workers > 1 and islands <= 1:
+            evaluator = SharedMemoryEvaluator(objf, workers=eval_workers)
+
+        # Optionally skip evaluating positions seen before; island processes
+        # would each hold a private copy, so islands run without it
+        cache = None
+        if cache_size > 0 and islands <= 1:
+            cache = EvaluationCache(evaluator or objf, size=cache_size, resolution=cache_resolution)
+
+        # Run the algorithm, resuming from its last snapshot if there is one
+        checkpoint = taskCheckpoint(checkpoint_dir, algorithm_name, objf.__name__, checkpoint_every, checkpoint_parameters())
+        progress = None
+        if progress_queue is not None:
+            progress = QueueProgress(progress_queue, (algorithm_name, objf.__name__))
+        try:
+            if islands > 1:
+                # Islands are not checkpointed and report no per-iteration progress
+                result = islandModel(
+                    algorithm,
+                    objf=objf,
+                    lb=lb,
+                    ub=ub,
+                    dim=dim,
+                    N=N,
+                    Max_iteration=Max_iteration,
+                    islands=islands,
+                    topology=migration_topology,
+                    every=migration_every,
+                    rate=migration_rate,
+                    stopping=stopping,
+                    rng=numpy.random.default_rng(seed),
+                    precision=precision,
+                    budget=budget,
+                )
+            else:
+                result = algorithm(
+                    objf=cache or evaluator or objf,
+                    lb=lb,
+                    ub=ub,
+                    dim=dim,
+                    N=N,
+                    Max_iteration=Max_iteration,
+                    checkpoint=checkpoint,
+                    stopping=stopping,
+                    progress=progress,
+                    rng=numpy.random.default_rng(seed),
+                    precision=precision,
+                    budget=budget,
+                )
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+            if progress is not None:
+                progress.close()
 
         # End timing for this specific task
         end_time = time.time()
-        task_time = end_time - start_time
+        # a resumed run started before this call, in its first attempt
+        task_time = end_time - min(start_time, result.startTime)
 
         # Add the current process ID to the unique list
         unique_pids.append(os.getpid())
 
-        # Return results along with process ID and task time
-        return {
+        # Record the finished task so a resumed campaign skips it
+        task_result = {
             "algorithm": algorithm_name,
             "benchmark": objf.__name__,
-            "best_fitness": result.convergence[-1],
+            "best_fitness": float(result.convergence[-1]),
             "execution_time": task_time,
+            "evaluations": result.totalNoEvaluation,
+            "evaluations_per_second": result.totalNoEvaluation / task_time if task_time > 0 else None,
             "pid": os.getpid(),  # Process ID
+            "iterations": result.stopIteration,
+            "stop_reason": result.stopReason,
+            "convergence": result.convergence.tolist(),
+            "seed_index": seed_index,
         }
+        task_result.update(cacheColumns(cache))
+        saveTaskResult(checkpoint_dir, task_result, checkpoint_parameters())
+        checkpoint.clear()
+
+        # Return results along with process ID and task time
+        return task_result
     except Exception as e:
         unique_pids.append(os.getpid())
         return {
@@ -72,50 +179,99 @@ def main():
     # Start timing the program
     start_time = time.time()
 
-    # Initialize multiprocessing manager for unique PIDs
-    manager = Manager()
-    unique_pids = manager.list()
-
-    # Run tasks in parallel
-    tasks = []
-    with ProcessPoolExecutor() as executor:
-        for objf_index in benchmark_functions:
-            for algorithm_name, algorithm in algorithms.items():
-                tasks.append(executor.submit(run_algorithm, algorithm_name, algorithm, objf_index, unique_pids))
-
-        # Gather results
-        results = [task.result() for task in tasks]
-
-    # Define CSV file name
-    csv_file = "optimization_results_parallel.csv"
-
-    # Write results to the CSV
-    with open(csv_file, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Algorithm", "Benchmark", "Best Fitness", "Execution Time (s)", "PID"])
-        for result in results:
-            if "error" in result:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], "Error", result["execution_time"], result["pid"]]
-                )
-            else:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], result["best_fitness"], f"{result['execution_time']:.2f}", result["pid"]]
-                )
+    # Compile the kernels once, before any worker starts
+    kernels.useBackend(kernel_backend)
+    kernels.warmUp()
+
+    # PIDs and progress shared with the workers; threads need no Manager
+    unique_pids, progress_queue, manager = campaignChannels(backend, show_progress)
+
+    # Order the campaign longest-expected-first. An island-model task keeps
+    # one process per island busy, and any other task one per evaluation
+    # worker, so that many fewer tasks run at once.
+    processes_per_task = islands if islands > 1 else eval_workers
+    workers = max(1, os.cpu_count() // processes_per_task)
+    campaign = [(algorithm_name, objf_index) for objf_index in benchmark_functions for algorithm_name in algorithms]
+
+    # One independent stream per task, fixed by its place in this canonical order
+    entropy, seeds = campaignSeeds(root_seed, campaign)
+
+    # Skip tasks that an interrupted run of this campaign already finished
+    finished = [loadTaskResult(checkpoint_dir, algorithm_name, selectFunction(objf_index).__name__, checkpoint_parameters()) for algorithm_name, objf_index in campaign]
+    campaign = [task for task, result in zip(campaign, finished) if result is None]
+    finished = [result for result in finished if result is not None]
+    if finished:
+        print(f"Resuming campaign: {len(finished)} tasks already finished")
+
+    # On a time budget every task gets an equal share of what is left of
+    # it, so there is no cost to plan by
+    task_budget = None
+    if time_budget is not None:
+        predicted_makespan = time_budget - (time.time() - start_time)
+        task_budget = splitBudget(predicted_makespan, len(campaign), workers)
+        print(f"Time budget: {task_budget:.2f} seconds per task")
+    else:
+        campaign, predicted_makespan = planCampaign(
+            campaign, workers, source=schedule_source,
+            match={"dim": dim, "N": N, "Max_iteration": Max_iteration, "precision": precision, "islands": islands,
+                   "kernels": kernels.backend, "time_budget": None, "gea_synchronous": gea_synchronous},
+            algorithms={algorithm_name: configured(algorithm_name) for algorithm_name in algorithms}, lb=lb, ub=ub, dim=dim, N=N, Max_iteration=Max_iteration,
+        )
+    print(f"Predicted makespan: {predicted_makespan:.2f} seconds on {workers} workers")
+    tasks_per_process = {"process": 1, "thread": workers, "hybrid": min(threads_per_process, workers)}[backend]
+
+    # Aggregate the workers' progress into one live status line
+    if show_progress:
+        monitor = CampaignMonitor(progress_queue, len(campaign)).start()
+
+    # Run tasks in parallel, native thread pools capped to share the cores
+    dispatch_time = time.time()
+    results = finished + runTasks(
+        run_algorithm,
+        [
+            (algorithm_name, configured(algorithm_name), objf_index, unique_pids, *seeds[algorithm_name, objf_index], progress_queue, task_budget)
+            for algorithm_name, objf_index in campaign
+        ],
+        backend=backend,
+        workers=workers,
+        threads=threads_per_process,
+    )
+    achieved_makespan = time.time() - dispatch_time
+    if show_progress:
+        monitor.stop()
+
+    # The campaign is complete, nothing is left to resume
+    if not any("error" in result for result in results):
+        clearCampaign(checkpoint_dir)
 
     # Calculate and print total time
     end_time = time.time()
     total_time = end_time - start_time
+    unique_pid_count = len(set(unique_pids))
     print(f"\nTotal Program Execution Time: {total_time:.2f} seconds")
+    print(f"Makespan: predicted {predicted_makespan:.2f} s, achieved {achieved_makespan:.2f} s")
+
+    # Store the campaign, its tasks and their convergence curves
+    with ResultsStore() as store:
+        store.recordCampaign(
+            "parallel",
+            results,
+            total_time,
+            workers=workers,
+            processes=unique_pid_count,
+            parameters={"lb": lb, "ub": ub, "dim": dim, "N": N, "Max_iteration": Max_iteration, "root_seed": entropy, "precision": precision,
+                        "islands": islands, "migration": [migration_topology, migration_every, migration_rate],
+                        "backend": backend, "cache": [cache_size, cache_resolution], "threads": tasks_per_process, "native_threads": nativeThreadBudget(workers), "kernels": kernels.backend, "time_budget": time_budget,
+                        "gea_synchronous": gea_synchronous},
+            predicted_makespan=predicted_makespan,
+            achieved_makespan=achieved_makespan,
+            started=start_time,
+        )
 
-    # Append the total time and number of processes to the CSV
-    with open(csv_file, mode="a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["\nTotal Time (s): ", f"{total_time:.2f}"])
-        unique_pid_count = len(set(unique_pids))
-        writer.writerow(["\nNumber of CPU Processes Used: ", unique_pid_count])
+        throughput = store.throughput("parallel")
 
     print(f"\nNumber of CPU cores used: {unique_pid_count}\n")
+    print(throughputReport(throughput))
 
 
 if __name__ == "__main__":
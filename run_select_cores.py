@@ -1,13 +1,22 @@
+import argparse
+import functools
 import time
-import csv
 import os
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import Manager
+import numpy
 from SSA import SSA
 from MFO import MFO
 from GEA import GEA
 from functions import selectFunction
+from scheduler import planCampaign, splitBudget
+from checkpoint import taskCheckpoint, loadTaskResult, saveTaskResult, clearCampaign
+from stopping import RelativeImprovement
+from results_store import ResultsStore
+from progress import QueueProgress, CampaignMonitor
+from seeding import campaignSeeds
+import kernels
+from executors import BACKENDS, runTasks, campaignChannels, nativeThreadBudget
+from scalability_analysis import report, throughputReport
 
 # Benchmark function indices and algorithms
 benchmark_functions = [0, 1, 2, 4, 7, 8, 9, 10, 13]
@@ -23,6 +32,18 @@ ub = 100
 dim = 30
 N = 5000
 Max_iteration = 1000
+time_budget = None  # seconds for the whole campaign, shared equally by its tasks; None runs on Max_iteration
+schedule_source = "history"  # task cost estimates: "history" (past campaigns) or "calibrate"
+checkpoint_dir = "checkpoints"  # snapshots and finished tasks of an interrupted campaign
+checkpoint_every = 50  # iterations between snapshots, 0 disables them
+stopping = [RelativeImprovement(window=100, threshold=1e-8)]  # early termination, [] runs every iteration
+show_progress = True  # live campaign status line; False keeps the campaign silent
+root_seed = 2024  # every task's random stream derives from it, None draws fresh entropy
+precision = "double"  # "single" float32 throughout, or "mixed" float32 positions with float64 fitness
+backend = "process"  # run tasks as "process"es, "thread"s, or "hybrid" threads inside processes
+threads_per_process = 2  # tasks sharing one worker process under the hybrid backend
+kernel_backend = "numpy"  # "numba" opts into the compiled kernels, which need numba and round differently
+gea_synchronous = False  # GEA moves one eagle at a time as originally (False) or the whole flock at once (True)
 
 def get_core_count():
     max_cores = multiprocessing.cpu_count()
@@ -36,32 +57,70 @@ def get_core_count():
         except ValueError:
             print("Please enter a valid number")
 
-def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids):
+def checkpoint_parameters():
+    """ settings a snapshot or finished task must have been saved with to be reused """
+    return {
+        "lb": lb, "ub": ub, "dim": dim, "N": N, "Max_iteration": Max_iteration, "time_budget": time_budget,
+        "root_seed": root_seed, "precision": precision, "gea_synchronous": gea_synchronous,
+        "stopping": [[type(criterion).__name__, vars(criterion)] for criterion in stopping],
+    }
+
+def configured(algorithm_name):
+    """ the algorithm with this runner's settings applied """
+    if algorithm_name == "GEA":
+        return functools.partial(algorithms[algorithm_name], synchronous=gea_synchronous)
+    return algorithms[algorithm_name]
+
+def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids, seed_index, seed, progress_queue=None, budget=None, directory=checkpoint_dir):
     try:
         start_time = time.time()
         objf = selectFunction(objf_index)
+        checkpoint = taskCheckpoint(directory, algorithm_name, objf.__name__, checkpoint_every, checkpoint_parameters())
+        progress = None
+        if progress_queue is not None:
+            progress = QueueProgress(progress_queue, (algorithm_name, objf.__name__))
         
-        result = algorithm(
-            objf=objf,
-            lb=lb,
-            ub=ub,
-            dim=dim,
-            N=N,
-            Max_iteration=Max_iteration,
-        )
+        try:
+            result = algorithm(
+                objf=objf,
+                lb=lb,
+                ub=ub,
+                dim=dim,
+                N=N,
+                Max_iteration=Max_iteration,
+                checkpoint=checkpoint,
+                stopping=stopping,
+                progress=progress,
+                rng=numpy.random.default_rng(seed),
+                precision=precision,
+                budget=budget,
+            )
+        finally:
+            if progress is not None:
+                progress.close()
 
         end_time = time.time()
-        task_time = end_time - start_time
+        # a resumed run started before this call, in its first attempt
+        task_time = end_time - min(start_time, result.startTime)
         
         unique_pids.append(os.getpid())
         
-        return {
+        task_result = {
             "algorithm": algorithm_name,
             "benchmark": objf.__name__,
-            "best_fitness": result.convergence[-1],
+            "best_fitness": float(result.convergence[-1]),
             "execution_time": task_time,
+            "evaluations": result.totalNoEvaluation,
+            "evaluations_per_second": result.totalNoEvaluation / task_time if task_time > 0 else None,
             "pid": os.getpid(),
+            "iterations": result.stopIteration,
+            "stop_reason": result.stopReason,
+            "convergence": result.convergence.tolist(),
+            "seed_index": seed_index,
         }
+        saveTaskResult(directory, task_result, checkpoint_parameters())
+        checkpoint.clear()
+        return task_result
     except Exception as e:
         unique_pids.append(os.getpid())
         return {
@@ -72,63 +131,150 @@ def run_algorithm(algorithm_name, algorithm, objf_index, unique_pids):
             "pid": os.getpid(),
         }
 
-def update_scalability_data(cores, execution_time):
-    scalability_file = "scalability_data.csv"
-    file_exists = os.path.isfile(scalability_file)
-    
-    with open(scalability_file, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        if not file_exists:
-            writer.writerow(["Cores", "Execution Time (s)"])
-        writer.writerow([cores, f"{execution_time:.2f}"])
-
-def main():
-    cores_to_use = get_core_count()
+def run_campaign(cores_to_use, sweep=None, backend=backend):
     start_time = time.time()
+
+    # Compile the kernels once, before any worker starts
+    kernels.useBackend(kernel_backend)
+    kernels.warmUp()
     
-    manager = Manager()
-    unique_pids = manager.list()
-
-    tasks = []
-    with ProcessPoolExecutor(max_workers=cores_to_use) as executor:
-        for objf_index in benchmark_functions:
-            for algorithm_name, algorithm in algorithms.items():
-                tasks.append(executor.submit(run_algorithm, algorithm_name, algorithm, objf_index, unique_pids))
-
-        results = [task.result() for task in tasks]
-
-    csv_file = f"optimization_results_{cores_to_use}_cores.csv"
-
-    with open(csv_file, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Algorithm", "Benchmark", "Best Fitness", "Execution Time (s)", "PID"])
-        for result in results:
-            if "error" in result:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], "Error", result["execution_time"], result["pid"]]
-                )
-            else:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], result["best_fitness"], f"{result['execution_time']:.2f}", result["pid"]]
-                )
+    unique_pids, progress_queue, manager = campaignChannels(backend, show_progress)
+
+    campaign = [(algorithm_name, objf_index) for objf_index in benchmark_functions for algorithm_name in algorithms]
+
+    # Each campaign of a sweep keeps its own checkpoints, so it never takes
+    # the tasks another core count left behind as finished
+    directory = checkpoint_dir
+    if sweep is not None:
+        directory = os.path.join(checkpoint_dir, f"sweep_{sweep['sweep']}_{sweep['repeat']}_{cores_to_use}_{backend}")
+    entropy, seeds = campaignSeeds(root_seed, campaign)
+
+    finished = [loadTaskResult(directory, algorithm_name, selectFunction(objf_index).__name__, checkpoint_parameters()) for algorithm_name, objf_index in campaign]
+    campaign = [task for task, result in zip(campaign, finished) if result is None]
+    finished = [result for result in finished if result is not None]
+    if finished:
+        print(f"Resuming campaign: {len(finished)} tasks already finished")
+
+    task_budget = None
+    if time_budget is not None:
+        predicted_makespan = time_budget - (time.time() - start_time)
+        task_budget = splitBudget(predicted_makespan, len(campaign), cores_to_use)
+        print(f"Time budget: {task_budget:.2f} seconds per task")
+    else:
+        campaign, predicted_makespan = planCampaign(
+            campaign, cores_to_use, source=schedule_source,
+            match={"dim": dim, "N": N, "Max_iteration": Max_iteration, "precision": precision,
+                   "kernels": kernels.backend, "time_budget": None, "gea_synchronous": gea_synchronous},
+            algorithms={algorithm_name: configured(algorithm_name) for algorithm_name in algorithms}, lb=lb, ub=ub, dim=dim, N=N, Max_iteration=Max_iteration,
+        )
+    print(f"Predicted makespan: {predicted_makespan:.2f} seconds")
+
+    if show_progress:
+        monitor = CampaignMonitor(progress_queue, len(campaign)).start()
 
+    dispatch_time = time.time()
+    results = finished + runTasks(
+        run_algorithm,
+        [
+            (algorithm_name, configured(algorithm_name), objf_index, unique_pids, *seeds[algorithm_name, objf_index], progress_queue, task_budget, directory)
+            for algorithm_name, objf_index in campaign
+        ],
+        backend=backend,
+        workers=cores_to_use,
+        threads=threads_per_process,
+    )
+    achieved_makespan = time.time() - dispatch_time
+    if show_progress:
+        monitor.stop()
+
+    if not any("error" in result for result in results):
+        clearCampaign(directory)
+        if directory != checkpoint_dir and os.path.isdir(directory):
+            os.rmdir(directory)
+
+    # The measurement starts at dispatch: planning calibrates every task
+    # one after another when the history holds no campaign on this many
+    # cores, which would bias the first campaign of each core count
     end_time = time.time()
-    total_time = end_time - start_time
+    total_time = end_time - dispatch_time
     unique_pid_count = len(set(unique_pids))
+    tasks_per_process = {"process": 1, "thread": cores_to_use, "hybrid": min(threads_per_process, cores_to_use)}[backend]
 
-    with open(csv_file, mode="a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow([])
-        writer.writerow(["Total Time (s)", f"{total_time:.2f}"])
-        writer.writerow(["Requested CPU Cores", cores_to_use])
-        writer.writerow(["Actual CPU Processes Used", unique_pid_count])
-
-    # Update scalability data
-    update_scalability_data(cores_to_use, total_time)
+    # The campaign doubles as one scalability measurement for its core count
+    with ResultsStore() as store:
+        store.recordCampaign(
+            "select_cores",
+            results,
+            total_time,
+            workers=cores_to_use,
+            processes=unique_pid_count,
+            parameters={"lb": lb, "ub": ub, "dim": dim, "N": N, "Max_iteration": Max_iteration,
+                        "root_seed": entropy, "precision": precision, "backend": backend, "threads": tasks_per_process,
+                        "native_threads": nativeThreadBudget(cores_to_use), "kernels": kernels.backend, "time_budget": time_budget,
+                        "gea_synchronous": gea_synchronous, **(sweep or {})},
+            predicted_makespan=predicted_makespan,
+            achieved_makespan=achieved_makespan,
+            started=start_time,
+        )
 
-    print(f"\nTotal Program Execution Time: {total_time:.2f} seconds")
-    print(f"Number of CPU cores requested: {cores_to_use}")
+    print(f"\nTotal Program Execution Time: {end_time - start_time:.2f} seconds, {total_time:.2f} from dispatch")
+    print(f"Makespan: predicted {predicted_makespan:.2f} s, achieved {achieved_makespan:.2f} s")
+    print(f"Number of CPU cores requested: {cores_to_use} ({backend} backend)")
     print(f"Actual number of CPU processes used: {unique_pid_count}\n")
 
+    return total_time
+
+def parse_core_list(text):
+    return [int(cores) for cores in text.split(",") if cores.strip()]
+
+def parse_backend_list(text):
+    backends = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown backend(s) {', '.join(unknown)}")
+    return backends
+
+def main(argv=None):
+    max_cores = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(description="Run the campaign on a chosen number of cores")
+    parser.add_argument("--cores", type=int, help="run once on this many cores instead of asking")
+    parser.add_argument("--sweep", type=parse_core_list, help="comma-separated core counts to measure, e.g. 1,2,4,8")
+    parser.add_argument("--repeats", type=int, default=1, help="campaigns per core count")
+    parser.add_argument("--backends", type=parse_backend_list, default=[backend],
+                        help=f"comma-separated executor backends to measure, of {', '.join(BACKENDS)}")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        core_counts = args.sweep
+    elif args.cores:
+        core_counts = [args.cores]
+    else:
+        core_counts = [get_core_count()]
+    if any(not 1 <= cores <= max_cores for cores in core_counts):
+        parser.error(f"core counts must be between 1 and {max_cores}")
+
+    # Only measurements over several campaigns form a sweep; a single run
+    # leaves the sweep the visualization plots alone
+    sweeping = bool(args.sweep) or args.repeats > 1 or len(args.backends) > 1
+    sweep_id = time.time() if sweeping else None
+
+    # Repetitions go round the whole list so slow drift of the machine
+    # spreads over all core counts instead of biasing one of them
+    timings = {name: [] for name in args.backends}
+    for repeat in range(args.repeats):
+        for cores in core_counts:
+            for name in args.backends:
+                sweep = {"sweep": sweep_id, "repeat": repeat} if sweeping else None
+                total_time = run_campaign(cores, sweep=sweep, backend=name)
+                timings[name].append((cores, total_time))
+
+    for name, backend_timings in timings.items():
+        if len(backend_timings) > 1:
+            print(f"{name} backend:")
+            print(report(backend_timings))
+    if len(args.backends) > 1 or len(core_counts) > 1:
+        with ResultsStore() as store:
+            print(throughputReport(store.throughput("select_cores", sweep=sweep_id)))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,10 +1,19 @@
 import time
-import csv
+import functools
+import numpy
 import os  # For getting process ID
 from SSA import SSA
 from MFO import MFO
 from GEA import GEA
 from functions import selectFunction
+from stopping import RelativeImprovement
+from results_store import ResultsStore, cacheColumns
+from progress import ConsoleProgress
+from seeding import campaignSeeds
+import kernels
+from evaluation_cache import EvaluationCache
+from scheduler import splitBudget
+from lockstep import lockstep
 
 # Benchmark function indices and algorithms
 benchmark_functions = [0, 1, 2, 4, 7, 8, 9, 10, 13]  # Indices of functions in `selectFunction`
@@ -19,24 +28,50 @@ lb = -100         # Lower bound of search space
 ub = 100          # Upper bound of search space
 dim = 30          # Dimensionality of the problem
 N = 5000          # Population size
-Max_iteration = 1000  # Maximum number of iterations
+Max_iteration = 1000  # Maximum number of iterations, None for none under a time budget
+time_budget = None  # seconds for the whole campaign, shared equally by its tasks; None runs on Max_iteration
+stopping = [RelativeImprovement(window=100, threshold=1e-8)]  # early termination, [] runs every iteration
+progress_interval = 1.0  # seconds between progress lines, None keeps the runs silent
+root_seed = 2024  # every task's random stream derives from it, None draws fresh entropy
+precision = "double"  # "single" float32 throughout, or "mixed" float32 positions with float64 fitness
+cache_size = 0  # >0 remembers the fitness of up to this many positions per task
+cache_resolution = None  # grid cell size cached positions are matched by, which changes the results; None matches exactly and keeps them
+kernel_backend = "numpy"  # "numba" opts into the compiled kernels, which need numba and round differently
+lockstep_runs = False  # advance all benchmarks of an algorithm together as one (runs, N, dim) batch
+gea_synchronous = False  # GEA moves one eagle at a time as originally (False) or the whole flock at once (True)
+
+# The algorithm with this runner's settings applied
+def configured(algorithm_name):
+    if algorithm_name == "GEA":
+        return functools.partial(algorithms[algorithm_name], synchronous=gea_synchronous)
+    return algorithms[algorithm_name]
 
 # Wrapper function to run a single algorithm on a single benchmark function
-def run_algorithm(algorithm_name, algorithm, objf_index):
+def run_algorithm(algorithm_name, algorithm, objf_index, seed_index, seed, budget=None):
     try:
         start_time = time.time()
 
         # Select the objective function
         objf = selectFunction(objf_index)
 
+        # Optionally skip evaluating positions seen before
+        cache = None
+        if cache_size > 0:
+            cache = EvaluationCache(objf, size=cache_size, resolution=cache_resolution)
+
         # Run the algorithm
         result = algorithm(
-            objf=objf,
+            objf=cache or objf,
             lb=lb,
             ub=ub,
             dim=dim,
             N=N,
             Max_iteration=Max_iteration,
+            stopping=stopping,
+            progress=ConsoleProgress(progress_interval) if progress_interval is not None else None,
+            rng=numpy.random.default_rng(seed),
+            precision=precision,
+            budget=budget,
         )
 
 
@@ -44,13 +79,21 @@ def run_algorithm(algorithm_name, algorithm, objf_index):
         task_time = end_time - start_time
 
         # Return results along with process ID
-        return {
+        task_result = {
             "algorithm": algorithm_name,
             "benchmark": objf.__name__,
-            "best_fitness": result.convergence[-1],
+            "best_fitness": float(result.convergence[-1]),
             "execution_time": task_time,
+            "evaluations": result.totalNoEvaluation,
+            "evaluations_per_second": result.totalNoEvaluation / task_time if task_time > 0 else None,
             "pid": os.getpid(),  # Process ID
+            "iterations": result.stopIteration,
+            "stop_reason": result.stopReason,
+            "convergence": result.convergence.tolist(),
+            "seed_index": seed_index,
         }
+        task_result.update(cacheColumns(cache))
+        return task_result
     except Exception as e:
         return {
             "algorithm": algorithm_name,
@@ -60,54 +103,123 @@ def run_algorithm(algorithm_name, algorithm, objf_index):
             "pid": os.getpid(),  # Process ID
         }
 
+# Runs one algorithm on every benchmark function in lockstep
+def run_lockstep(algorithm_name, tasks, budget=None):
+    start_time = time.time()
+    objfs = [selectFunction(objf_index) for objf_index, _, _ in tasks]
+    caches = [EvaluationCache(objf, size=cache_size, resolution=cache_resolution) if cache_size > 0 else None for objf in objfs]
+    try:
+        solutions = lockstep(
+            algorithm_name,
+            [cache or objf for cache, objf in zip(caches, objfs)],
+            lb=lb,
+            ub=ub,
+            dim=dim,
+            N=N,
+            Max_iteration=Max_iteration,
+            rngs=[numpy.random.default_rng(seed) for _, _, seed in tasks],
+            stopping=stopping,
+            progress=ConsoleProgress(progress_interval) if progress_interval is not None else None,
+            precision=precision,
+            budget=budget,
+        )
+    except Exception as e:
+        return [
+            {
+                "algorithm": algorithm_name,
+                "benchmark": objf.__name__,
+                "error": str(e),
+                "execution_time": None,
+                "pid": os.getpid(),  # Process ID
+            }
+            for objf in objfs
+        ]
+
+    # The runs share every iteration, so each is charged an equal share of the batch
+    task_time = (time.time() - start_time) / len(tasks)
+    results = []
+    for (_, seed_index, _), cache, result in zip(tasks, caches, solutions):
+        task_result = {
+            "algorithm": algorithm_name,
+            "benchmark": result.objfname,
+            "best_fitness": float(result.convergence[-1]),
+            "execution_time": task_time,
+            "evaluations": result.totalNoEvaluation,
+            "evaluations_per_second": result.totalNoEvaluation / task_time if task_time > 0 else None,
+            "pid": os.getpid(),  # Process ID
+            "iterations": result.stopIteration,
+            "stop_reason": result.stopReason,
+            "convergence": result.convergence.tolist(),
+            "seed_index": seed_index,
+        }
+        task_result.update(cacheColumns(cache))
+        results.append(task_result)
+    return results
+
 # Main function
 def main():
     # Start timing the program
     start_time = time.time()
 
+    # Compile the kernels once
+    kernels.useBackend(kernel_backend)
+    kernels.warmUp()
+
     # List to store results
     results = []
 
     # List to store unique PIDs
     unique_pids = []
 
-    # Run tasks sequentially
-    for objf_index in benchmark_functions:
-        for algorithm_name, algorithm in algorithms.items():
-            result = run_algorithm(algorithm_name, algorithm, objf_index)
-            results.append(result)
-            unique_pids.append(result["pid"])
-
-    # Define CSV file name
-    csv_file = "optimization_results_single.csv"
-
-    # Write results to the CSV
-    with open(csv_file, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Algorithm", "Benchmark", "Best Fitness", "Execution Time (s)", "PID"])
-        for result in results:
-            if "error" in result:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], "Error", result["execution_time"], result["pid"]]
-                )
-            else:
-                writer.writerow(
-                    [result["algorithm"], result["benchmark"], result["best_fitness"], f"{result['execution_time']:.2f}", result["pid"]]
-                )
+    # Each task draws from the same stream as in the parallel runners
+    campaign = [(algorithm_name, objf_index) for objf_index in benchmark_functions for algorithm_name in algorithms]
+    entropy, seeds = campaignSeeds(root_seed, campaign)
+
+    # On a time budget the tasks share what is left of it equally; a
+    # lockstep batch gets the shares of all its runs
+    task_budget = None
+    if time_budget is not None:
+        task_budget = splitBudget(time_budget - (time.time() - start_time), len(campaign), 1)
+
+    # Run tasks sequentially, or each algorithm's tasks as one lockstep batch;
+    # lockstep GEA moves the whole flock at once
+    if lockstep_runs and "GEA" in algorithms and not gea_synchronous:
+        raise ValueError("lockstep GEA is synchronous, set gea_synchronous = True or lockstep_runs = False")
+    if lockstep_runs:
+        for algorithm_name in algorithms:
+            batch = run_lockstep(
+                algorithm_name,
+                [(objf_index, *seeds[algorithm_name, objf_index]) for objf_index in benchmark_functions],
+                task_budget * len(benchmark_functions) if task_budget is not None else None,
+            )
+            results.extend(batch)
+            unique_pids.extend(result["pid"] for result in batch)
+    else:
+        for objf_index in benchmark_functions:
+            for algorithm_name in algorithms:
+                result = run_algorithm(algorithm_name, configured(algorithm_name), objf_index, *seeds[algorithm_name, objf_index], task_budget)
+                results.append(result)
+                unique_pids.append(result["pid"])
 
     # Calculate and print total time
     end_time = time.time()
     total_time = end_time - start_time
     print(f"\nTotal Program Execution Time: {total_time:.2f} seconds")
 
-    # Append total time and number of CPU cores to the CSV
-    with open(csv_file, mode="a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["\nTotal Time (s): ", f"{total_time:.2f}"])
-
-        # Count and write the number of CPU processes used
-        unique_pid_count = len(set(unique_pids))
-        writer.writerow(["\nNumber of CPU Processes Used: ", unique_pid_count])
+    # Count the number of CPU processes used
+    unique_pid_count = len(set(unique_pids))
+
+    # Store the campaign, its tasks and their convergence curves
+    with ResultsStore() as store:
+        store.recordCampaign(
+            "single",
+            results,
+            total_time,
+            workers=1,
+            processes=unique_pid_count,
+            parameters={"lb": lb, "ub": ub, "dim": dim, "N": N, "Max_iteration": Max_iteration, "root_seed": entropy, "precision": precision, "cache": [cache_size, cache_resolution], "lockstep": lockstep_runs, "kernels": kernels.backend, "time_budget": time_budget, "gea_synchronous": gea_synchronous},
+            started=start_time,
+        )
 
     # Display the number of unique processes in the console
     print(f"\nNumber of CPU cores used: {unique_pid_count}")
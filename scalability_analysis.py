@@ -0,0 +1,92 @@
+import numpy
+
+# Speedup analysis for the campaign timings recorded per core count. All
+# ratios are taken against the smallest core count measured (p0), which is
+# 1 after a full sweep but need not be: speedup is T(p0) / T(p), ideal
+# speedup is p / p0 and parallel efficiency is their ratio.
+
+
+def summarize(rows):
+    """
+    rows of (cores, execution_time), possibly several per core count, as a
+    dict of arrays sorted by cores: cores, runs, median, min, max, q1, q3
+    """
+    by_cores = {}
+    for cores, seconds in rows:
+        by_cores.setdefault(int(cores), []).append(float(seconds))
+    cores = sorted(by_cores)
+    samples = [numpy.array(by_cores[p]) for p in cores]
+    return {
+        "cores": numpy.array(cores),
+        "runs": numpy.array([len(s) for s in samples]),
+        "median": numpy.array([numpy.median(s) for s in samples]),
+        "min": numpy.array([s.min() for s in samples]),
+        "max": numpy.array([s.max() for s in samples]),
+        "q1": numpy.array([numpy.percentile(s, 25) for s in samples]),
+        "q3": numpy.array([numpy.percentile(s, 75) for s in samples]),
+    }
+
+
+def speedup(summary):
+    """ measured and ideal speedup and parallel efficiency, from the medians """
+    cores = summary["cores"]
+    median = summary["median"]
+    measured = median[0] / median
+    ideal = cores / cores[0]
+    return measured, ideal, measured / ideal
+
+
+def fitAmdahl(cores, times):
+    """
+    least-squares fit of T(p) = T1 * (f + (1 - f) / p); returns (T1, f),
+    the one-core time and the serial fraction. Needs two core counts.
+    """
+    cores = numpy.asarray(cores, dtype=float)
+    times = numpy.asarray(times, dtype=float)
+    if len(numpy.unique(cores)) < 2:
+        raise ValueError("an Amdahl fit needs timings for at least two core counts")
+    design = numpy.column_stack((numpy.ones_like(cores), 1 / cores))
+    (serial, parallel), *_ = numpy.linalg.lstsq(design, times, rcond=None)
+    t1 = serial + parallel
+    return t1, min(max(serial / t1, 0.0), 1.0)
+
+
+def amdahlTime(t1, serial_fraction, cores):
+    return t1 * (serial_fraction + (1 - serial_fraction) / numpy.asarray(cores, dtype=float))
+
+
+def report(rows):
+    """ one text table: spread per core count, speedup, efficiency and the Amdahl fit """
+    summary = summarize(rows)
+    measured, ideal, efficiency = speedup(summary)
+    lines = [f"{'Cores':>5} {'Runs':>4} {'Median (s)':>11} {'Min':>9} {'Max':>9} {'Speedup':>8} {'Ideal':>6} {'Eff.':>6}"]
+    for k, cores in enumerate(summary["cores"]):
+        lines.append(
+            f"{cores:>5} {summary['runs'][k]:>4} {summary['median'][k]:>11.2f} {summary['min'][k]:>9.2f}"
+            f" {summary['max'][k]:>9.2f} {measured[k]:>8.2f} {ideal[k]:>6.2f} {efficiency[k]:>6.2f}"
+        )
+    if len(summary["cores"]) >= 2:
+        t1, serial_fraction = fitAmdahl(summary["cores"], summary["median"])
+        lines.append(
+            f"Amdahl fit: serial fraction {serial_fraction:.3f}, one-core time {t1:.2f} s,"
+            f" maximum speedup {1 / max(serial_fraction, 1e-12):.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def throughputReport(rows):
+    """
+    rows of (backend, workers, threads, evaluations per second) as one text
+    table of medians per configuration, fastest first
+    """
+    by_config = {}
+    for backend, workers, threads, rate in rows:
+        by_config.setdefault((backend, workers, threads), []).append(rate)
+    ranked = sorted(by_config.items(), key=lambda item: -numpy.median(item[1]))
+    lines = [f"{'Backend':<8} {'Workers':>7} {'Threads':>7} {'Runs':>4} {'Evaluations/s':>14}"]
+    for (backend, workers, threads), rates in ranked:
+        lines.append(f"{backend:<8} {workers:>7} {threads or 1:>7} {len(rates):>4} {numpy.median(rates):>14.0f}")
+    if ranked:
+        (backend, workers, threads), _ = ranked[0]
+        lines.append(f"Best throughput: {backend} backend, {workers} workers, {threads or 1} threads per process")
+    return "\n".join(lines)
@@ -1,33 +1,76 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import ResultsStore
+from scalability_analysis import summarize, speedup, fitAmdahl, amdahlTime, report
 
-# Load scalability data
-data_file = "scalability_data.csv"
-scalability_data = pd.read_csv(data_file)
+backend = None  # executor backend to plot when a sweep measured several, None plots all
 
-# Extract columns
-cores = scalability_data["Cores"]
-execution_times = scalability_data["Execution Time (s)"]
+# Load scalability data: the latest sweep if there is one, otherwise every
+# campaign recorded per core count
+with ResultsStore() as store:
+    sweep = store.latestSweep()
+    rows = store.scalability(sweep=sweep, backend=backend)
+scalability_data = pd.DataFrame(rows, columns=["Cores", "Execution Time (s)"])
+
+# Median and spread per core count, speedup and efficiency against the ideal
+summary = summarize(scalability_data.itertuples(index=False))
+cores = summary["cores"]
+execution_times = summary["median"]
+measured_speedup, ideal_speedup, efficiency = speedup(summary)
 
 # Compute ideal scalability for comparison
-ideal_times = execution_times[0] / cores
+ideal_times = execution_times[0] * cores[0] / cores
+
+# Amdahl's law fitted to the medians
+fit_cores = np.linspace(cores.min(), cores.max(), 200)
+has_fit = len(cores) >= 2
+if has_fit:
+    t1, serial_fraction = fitAmdahl(cores, execution_times)
+    amdahl_times = amdahlTime(t1, serial_fraction, fit_cores)
+    amdahl_speedup = amdahlTime(t1, serial_fraction, cores[0]) / amdahl_times
 
-# Plot the scalability curve
-plt.figure(figsize=(10, 6))
-plt.plot(cores, execution_times, marker='o', label='Measured Execution Time', color='blue')
+print(report(scalability_data.itertuples(index=False)))
 
-# Add labels, title, and legend
-plt.xlabel("Number of Cores", fontsize=12)
-plt.ylabel("Execution Time (s)", fontsize=12)
-plt.title("Performance Scalability of Parallelized Code", fontsize=14)
-plt.xticks(cores)
-plt.legend(fontsize=10)
+fig, (ax_time, ax_speedup, ax_efficiency) = plt.subplots(1, 3, figsize=(18, 6))
 
-# Annotate points
+# Execution time: median with min-max spread, ideal and Amdahl curves
+ax_time.errorbar(
+    cores, execution_times,
+    yerr=[execution_times - summary["min"], summary["max"] - execution_times],
+    marker='o', capsize=4, label='Measured Execution Time (median, min-max)', color='blue',
+)
+ax_time.plot(cores, ideal_times, linestyle='--', marker='x', label='Ideal Execution Time', color='green')
+if has_fit:
+    ax_time.plot(fit_cores, amdahl_times, label=f"Amdahl Fit (serial fraction {serial_fraction:.3f})", color='red')
 for i, txt in enumerate(execution_times):
-    plt.annotate(f'{txt:.2f}s', (cores[i], execution_times[i]), textcoords="offset points", xytext=(-10, 5), ha='center')
+    ax_time.annotate(f'{txt:.2f}s', (cores[i], execution_times[i]), textcoords="offset points", xytext=(-10, 5), ha='center')
+ax_time.set_xlabel("Number of Cores", fontsize=12)
+ax_time.set_ylabel("Execution Time (s)", fontsize=12)
+ax_time.set_title("Execution Time", fontsize=14)
+
+# Speedup against the smallest measured core count
+ax_speedup.plot(cores, measured_speedup, marker='o', label='Measured Speedup', color='blue')
+ax_speedup.plot(cores, ideal_speedup, linestyle='--', marker='x', label='Ideal Speedup', color='green')
+if has_fit:
+    ax_speedup.plot(fit_cores, amdahl_speedup, label='Amdahl Fit', color='red')
+ax_speedup.set_xlabel("Number of Cores", fontsize=12)
+ax_speedup.set_ylabel(f"Speedup (vs. {cores[0]} cores)", fontsize=12)
+ax_speedup.set_title("Speedup", fontsize=14)
+
+# Parallel efficiency
+ax_efficiency.plot(cores, efficiency, marker='o', label='Measured Efficiency', color='blue')
+ax_efficiency.axhline(1.0, linestyle='--', label='Ideal Efficiency', color='green')
+ax_efficiency.set_ylim(0, 1.1 * max(1.0, efficiency.max()))
+ax_efficiency.set_xlabel("Number of Cores", fontsize=12)
+ax_efficiency.set_ylabel("Parallel Efficiency", fontsize=12)
+ax_efficiency.set_title("Parallel Efficiency", fontsize=14)
+
+for ax in (ax_time, ax_speedup, ax_efficiency):
+    ax.set_xticks(cores)
+    ax.legend(fontsize=10)
+    ax.grid(True, linestyle='--', alpha=0.7)
 
-plt.grid(True, linestyle='--', alpha=0.7)
-plt.tight_layout()
+fig.suptitle("Performance Scalability of Parallelized Code", fontsize=16)
+fig.tight_layout()
 plt.show()
@@ -0,0 +1,90 @@
+import heapq
+import time
+from functions import selectFunction
+from results_store import ResultsStore, RESULTS_DB
+
+# Longest-expected-first dispatch for a campaign of (algorithm, benchmark)
+# tasks. Costs come from earlier campaigns in the results store or from a
+# short calibration run of every task; the campaign is then submitted in
+# decreasing cost order so no long job is left to start last. Only past
+# campaigns run with the same parameters and worker count count as
+# history. A campaign on a time budget instead gives every task an equal
+# share of it.
+
+
+def loadHistory(path=RESULTS_DB, parameters=None, workers=None):
+    """ mean execution time per (algorithm, benchmark) over past campaigns like this one """
+    with ResultsStore(path) as store:
+        return store.taskHistory(parameters, workers)
+
+
+def calibrate(tasks, algorithms, lb, ub, dim, N, Max_iteration, iterations=3):
+    """ time a few iterations of every task and scale up to Max_iteration """
+    costs = {}
+    for algorithm_name, objf_index in tasks:
+        objf = selectFunction(objf_index)
+        start_time = time.time()
+        algorithm = algorithms[algorithm_name]
+        algorithm(objf=objf, lb=lb, ub=ub, dim=dim, N=N, Max_iteration=iterations + 1)
+        elapsed = time.time() - start_time
+        costs[(algorithm_name, objf.__name__)] = elapsed * Max_iteration / iterations
+    return costs
+
+
+def estimateCosts(tasks, history):
+    """
+    expected seconds per task; tasks missing from `history` get the mean of
+    their algorithm's known tasks, or the overall mean if it has none
+    """
+    overall = sum(history.values()) / len(history) if history else 1.0
+    costs = []
+    for algorithm_name, objf_index in tasks:
+        key = (algorithm_name, selectFunction(objf_index).__name__)
+        if key in history:
+            costs.append(history[key])
+            continue
+        same_algorithm = [v for (alg, _), v in history.items() if alg == algorithm_name]
+        costs.append(sum(same_algorithm) / len(same_algorithm) if same_algorithm else overall)
+    return costs
+
+
+def predictMakespan(costs, workers):
+    """ makespan of dispatching `costs` in order to the first free worker """
+    finish_times = [0.0] * max(1, min(workers, len(costs)))
+    for cost in costs:
+        heapq.heapreplace(finish_times, finish_times[0] + cost)
+    return max(finish_times)
+
+
+def splitBudget(budget, tasks, workers):
+    """
+    seconds each of `tasks` tasks may run for all of them to finish within
+    `budget` seconds on `workers`: with equal shares they run in
+    ceil(tasks / workers) waves. A budget already spent leaves every task
+    a single iteration.
+    """
+    waves = max(1, -(-tasks // max(1, workers)))
+    return max(budget, 0.0) / waves
+
+
+def longestFirst(tasks, costs):
+    """ tasks and their costs reordered longest-expected-first """
+    order = sorted(range(len(tasks)), key=lambda k: costs[k], reverse=True)
+    return [tasks[k] for k in order], [costs[k] for k in order]
+
+
+def planCampaign(tasks, workers, source="history", match=None, **calibration):
+    """
+    Orders `tasks` (a list of (algorithm_name, objf_index)) for dispatch and
+    returns (ordered_tasks, predicted_makespan). `source` is "history" to
+    use past campaigns on `workers` workers whose recorded parameters
+    include `match`, falling back to calibration when there are none, or
+    "calibrate" to always time the tasks first; calibration needs the
+    algorithms and the run parameters as keyword arguments.
+    """
+    history = loadHistory(parameters=match, workers=workers) if source == "history" else {}
+    if not history:
+        history = calibrate(tasks, **calibration)
+    costs = estimateCosts(tasks, history)
+    ordered_tasks, ordered_costs = longestFirst(tasks, costs)
+    return ordered_tasks, predictMakespan(ordered_costs, workers)
@@ -0,0 +1,18 @@
+import numpy
+
+# Random streams of a campaign. Every (algorithm, benchmark) task gets its
+# own child of one root SeedSequence; the child depends only on the root
+# seed and the task's position in the canonical campaign order, so a task
+# draws the same numbers whichever runner, worker or schedule position it
+# ends up in, and no two tasks share a stream.
+
+
+def campaignSeeds(root_seed, tasks):
+    """
+    (entropy, seeds) for the canonical task list `tasks`: the root entropy,
+    which replays the campaign when passed back as `root_seed` (None draws
+    fresh entropy), and a dict mapping each task to (seed_index, SeedSequence)
+    """
+    root = numpy.random.SeedSequence(root_seed)
+    children = root.spawn(len(tasks))
+    return root.entropy, {task: (index, child) for index, (task, child) in enumerate(zip(tasks, children))}
@@ -0,0 +1,483 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing.connection import Client, Listener
+import numpy
+from SSA import SSA
+from MFO import MFO
+from GEA import GEA
+from functions import selectFunction
+from enumFunctions import Functions
+from progress import QueueProgress
+from stopping import Stall, RelativeImprovement, TargetFitness, TimeLimit, EvaluationBudget
+from results_store import ResultsStore
+import kernels
+from executors import limitNativeThreads, nativeThreadBudget
+
+# Long-running optimization service. It keeps one warm process pool, whose
+# workers have NumPy, the optimizers and the compiled kernels loaded
+# already, and accepts jobs from any number of local clients over a
+# multiprocessing connection. Each job is one run of GEA, MFO or SSA on
+# one benchmark. Clients get results back as their jobs finish, tagged
+# with the id they chose, and can ask for a job's progress events too. A
+# run through the service costs its optimization and one round trip,
+# without the interpreter, pool and Manager start-up of a runner.
+#
+# The listener binds to the loopback interface only, and connections must
+# present the authkey: OPTIMIZATION_SERVICE_KEY when it is set, otherwise
+# a random key the service draws at start-up and writes to a file only its
+# owner can read. Messages are JSON, never pickles, so a job is plain data
+# and stopping criteria are given by name and arguments.
+
+ADDRESS = ("127.0.0.1", 47013)
+AUTHKEY_VARIABLE = "OPTIMIZATION_SERVICE_KEY"
+
+algorithms = {
+    "SSA": SSA,
+    "MFO": MFO,
+    "GEA": GEA,
+}
+
+criteria = {
+    "Stall": Stall,
+    "RelativeImprovement": RelativeImprovement,
+    "TargetFitness": TargetFitness,
+    "TimeLimit": TimeLimit,
+    "EvaluationBudget": EvaluationBudget,
+}
+
+JOB_KEYS = ("algorithm", "function", "lb", "ub", "dim", "N", "Max_iteration", "seed",
+            "precision", "budget", "stopping", "progress")
+
+# Worker-side progress queue, set once by the pool initializer
+_progress = None
+
+
+def _init_worker(threads, kernel_backend, progress_queue):
+    global _progress
+    _progress = progress_queue
+    limitNativeThreads(threads)
+    kernels.useBackend(kernel_backend)
+    kernels.warmUp()
+
+
+def _ready():
+    return os.getpid()
+
+
+def keyFile(address):
+    """ where the service listening on `address` keeps its authkey """
+    return os.path.join(os.path.expanduser("~"), f".optimization_service_{address[1]}.key")
+
+
+def serviceKey(address):
+    """ the authkey clients of the service on `address` present """
+    key = os.environ.get(AUTHKEY_VARIABLE)
+    if key:
+        return key.encode()
+    try:
+        with open(keyFile(address), "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        raise ConnectionError(f"no service key in {keyFile(address)}; is the service running?") from None
+
+
+def _write_key(path, key):
+    # a fresh file, so its mode is ours even if an old one was readable
+    if os.path.exists(path):
+        os.unlink(path)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, "wb") as file:
+        file.write(key)
+
+
+def _plain(value):
+    if isinstance(value, numpy.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} cannot be sent")
+
+
+def send(connection, message):
+    connection.send_bytes(json.dumps(message, default=_plain).encode())
+
+
+def receive(connection):
+    return json.loads(connection.recv_bytes())
+
+
+def jobFunction(function):
+    """ the objective of a job's `function`: a benchmark index or name """
+    if isinstance(function, str):
+        if function not in Functions.__members__:
+            raise ValueError(f"unknown benchmark {function!r}")
+        function = Functions[function]
+    objf = selectFunction(function)
+    if not callable(objf):
+        raise ValueError(f"unknown benchmark {function!r}")
+    return objf
+
+
+def jobCriteria(stopping):
+    """ stopping criteria from their [name, {argument: value}] pairs """
+    built = []
+    for name, arguments in stopping or []:
+        if name not in criteria:
+            raise ValueError(f"unknown stopping criterion {name!r}, expected one of {', '.join(criteria)}")
+        built.append(criteria[name](**arguments))
+    return built
+
+
+def runJob(job, task=None):
+    """
+    Runs one job and returns its result in the form of the runners' task
+    results. `job` is a dict of algorithm, function, lb, ub, dim, N,
+    Max_iteration and seed, and optionally precision, budget, stopping
+    ([name, arguments] pairs) and progress; progress events go to the
+    pool's queue tagged with `task`.
+    """
+    start_time = time.time()
+    try:
+        unknown = set(job) - set(JOB_KEYS)
+        if unknown:
+            raise ValueError(f"unknown job fields {', '.join(sorted(unknown))}")
+        if job["algorithm"] not in algorithms:
+            raise ValueError(f"unknown algorithm {job['algorithm']!r}, expected one of {', '.join(algorithms)}")
+        objf = jobFunction(job["function"])
+        stopping = jobCriteria(job.get("stopping"))
+        progress = None
+        if job.get("progress") and _progress is not None:
+            progress = QueueProgress(_progress, task)
+        try:
+            result = algorithms[job["algorithm"]](
+                objf=objf,
+                lb=job["lb"],
+                ub=job["ub"],
+                dim=job["dim"],
+                N=job["N"],
+                Max_iteration=job.get("Max_iteration"),
+                stopping=stopping,
+                progress=progress,
+                rng=numpy.random.default_rng(job.get("seed")),
+                precision=job.get("precision", "double"),
+                budget=job.get("budget"),
+            )
+        finally:
+            if progress is not None:
+                progress.close()
+
+        task_time = time.time() - start_time
+        return {
+            "algorithm": job["algorithm"],
+            "benchmark": objf.__name__,
+            "best_fitness": float(result.convergence[-1]),
+            "best_individual": numpy.asarray(result.bestIndividual).tolist(),
+            "execution_time": task_time,
+            "evaluations": result.totalNoEvaluation,
+            "evaluations_per_second": result.totalNoEvaluation / task_time if task_time > 0 else None,
+            "pid": os.getpid(),
+            "iterations": result.stopIteration,
+            "stop_reason": result.stopReason,
+            "convergence": result.convergence.tolist(),
+            "seed": job.get("seed"),
+        }
+    except Exception as e:
+        return failedJob(job, str(e), time.time() - start_time, os.getpid())
+
+
+def failedJob(job, error, execution_time=None, pid=None):
+    """ the result of a job that did not run to the end """
+    return {
+        "algorithm": job.get("algorithm"),
+        "benchmark": str(job.get("function")),
+        "error": error,
+        "execution_time": execution_time,
+        "pid": pid,
+    }
+
+
+class OptimizationService:
+    """
+    The server end. Messages from a client are ("run", job_id, job) and
+    ("stop",), which shuts the whole service down once the jobs in flight
+    have finished; it answers ("result", job_id, result) and, for jobs that
+    ask for progress, ("progress", job_id, event) with the ProgressEvent
+    fields as a dict. A client that disconnects takes its pending answers
+    with it but not its jobs. Without an `authkey` the service draws one and
+    keeps it in keyFile(address) while it runs.
+    """
+
+    def __init__(self, address=ADDRESS, authkey=None, workers=None, kernel_backend=None):
+        self.address = address
+        self.authkey = authkey
+        self._key_file = None
+        self.workers = workers or os.cpu_count()
+        self.kernel_backend = kernel_backend
+        self._clients = {}
+        self._client_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pool_lock = threading.Lock()
+
+    def start(self):
+        """ starts the pool, warms every worker and opens the listener """
+        self._queue = multiprocessing.Queue()
+        self._pool = self._new_pool()
+        # start every worker now rather than on the first jobs
+        for future in [self._pool.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+        self._forwarder = threading.Thread(target=self._forward_progress, daemon=True)
+        self._forwarder.start()
+        if self.authkey is None and os.environ.get(AUTHKEY_VARIABLE):
+            self.authkey = os.environ[AUTHKEY_VARIABLE].encode()
+        if self.authkey is None:
+            self.authkey = secrets.token_hex(32).encode()
+            self._listener = Listener(self.address, authkey=self.authkey)
+            self._key_file = keyFile(self._listener.address)
+            _write_key(self._key_file, self.authkey)
+        else:
+            self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address
+        print(f"Optimization service on {self.address[0]}:{self.address[1]} with {self.workers} warm workers", flush=True)
+        return self
+
+    def serveForever(self):
+        try:
+            while not self._stopping.is_set():
+                try:
+                    connection = self._listener.accept()
+                except (OSError, EOFError, multiprocessing.AuthenticationError):
+                    # a failed handshake ends that connection, not the service
+                    continue
+                if self._stopping.is_set():
+                    connection.close()
+                    break
+                client = next(self._client_ids)
+                with self._lock:
+                    self._clients[client] = (connection, threading.Lock())
+                threading.Thread(target=self._serve, args=(client, connection), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        self._stopping.set()
+        self._listener.close()
+        self._pool.shutdown()
+        self._queue.put(None)
+        self._forwarder.join()
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for connection, _ in clients:
+            connection.close()
+        if self._key_file is not None and os.path.exists(self._key_file):
+            os.unlink(self._key_file)
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(nativeThreadBudget(self.workers), self.kernel_backend, self._queue),
+        )
+
+    def _replace_pool(self, broken):
+        """ swaps in a fresh pool for `broken`, unless that has happened already """
+        with self._pool_lock:
+            if self._pool is broken and not self._stopping.is_set():
+                print("A worker process died; restarting the pool", flush=True)
+                self._pool = self._new_pool()
+        broken.shutdown(wait=False)
+
+    def _submit(self, job, task):
+        """ (pool, future) of `job`, on a fresh pool if the current one has broken """
+        pool = self._pool
+        try:
+            return pool, pool.submit(runJob, job, task)
+        except BrokenExecutor:
+            self._replace_pool(pool)
+            pool = self._pool
+            return pool, pool.submit(runJob, job, task)
+
+    def _serve(self, client, connection):
+        try:
+            while True:
+                try:
+                    message = receive(connection)
+                except (EOFError, OSError, ValueError):
+                    break
+                if not isinstance(message, list) or not message:
+                    break
+                if message[0] == "run":
+                    if len(message) != 3 or not isinstance(message[2], dict):
+                        break
+                    _, job_id, job = message
+                    try:
+                        pool, future = self._submit(job, (client, job_id))
+                    except BrokenExecutor as e:
+                        self._send(client, ("result", job_id, failedJob(job, f"the worker pool is broken: {e}")))
+                        continue
+                    except RuntimeError:
+                        # submit() after shutdown
+                        self._send(client, ("result", job_id, failedJob(job, "the service is shutting down")))
+                        continue
+                    future.add_done_callback(
+                        lambda future, job_id=job_id, job=job, pool=pool: self._answer(client, job_id, job, pool, future)
+                    )
+                elif message[0] == "stop" and not self._stopping.is_set():
+                    self._stopping.set()
+                    # wake the listener blocked in accept()
+                    Client(self.address, authkey=self.authkey).close()
+        finally:
+            with self._lock:
+                self._clients.pop(client, None)
+
+    def _answer(self, client, job_id, job, pool, future):
+        try:
+            result = future.result()
+        except BrokenExecutor as e:
+            # a worker died (out of memory, a crash in native code) and took
+            # the pool's jobs in flight with it; later jobs get a new pool
+            result = failedJob(job, f"a worker process died: {e}")
+            self._replace_pool(pool)
+        except Exception as e:
+            # runJob reports its own errors; this is the pool failing
+            result = failedJob(job, str(e) or type(e).__name__)
+        self._send(client, ("result", job_id, result))
+
+    def _send(self, client, message):
+        with self._lock:
+            connection, lock = self._clients.get(client, (None, None))
+        if connection is None:
+            return
+        try:
+            with lock:
+                send(connection, message)
+        except (OSError, ValueError):
+            pass
+
+    def _forward_progress(self):
+        for message in iter(self._queue.get, None):
+            (client, job_id), event = message
+            if event is not None:
+                self._send(client, ("progress", job_id, event._asdict()))
+
+
+class ServiceClient:
+    """
+    The client end. submit() queues a job and returns its id; results()
+    yields (job_id, result) as jobs finish, until every submitted job has
+    answered, and hands progress events to `on_progress(job_id, event)`.
+    The authkey defaults to the service's, see serviceKey().
+    """
+
+    def __init__(self, address=ADDRESS, authkey=None):
+        self.connection = Client(address, authkey=authkey if authkey is not None else serviceKey(address))
+        self._job_ids = itertools.count()
+        self._pending = set()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, algorithm, function, lb, ub, dim, N, Max_iteration, seed=None, **options):
+        job_id = next(self._job_ids)
+        job = {"algorithm": algorithm, "function": function, "lb": lb, "ub": ub, "dim": dim,
+               "N": N, "Max_iteration": Max_iteration, "seed": seed, **options}
+        send(self.connection, ("run", job_id, job))
+        self._pending.add(job_id)
+        return job_id
+
+    def results(self, on_progress=None):
+        while self._pending:
+            kind, job_id, payload = receive(self.connection)
+            if kind == "progress":
+                if on_progress is not None:
+                    on_progress(job_id, payload)
+                continue
+            self._pending.discard(job_id)
+            yield job_id, payload
+
+    def stop(self):
+        """ shuts the service down """
+        send(self.connection, ("stop",))
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or ADDRESS[0], int(port)
+
+
+def parse_list(text, kind=str):
+    return [kind(item.strip()) for item in text.split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm optimization service and its command-line client")
+    parser.add_argument("--address", type=parse_address, default=ADDRESS, help="host:port of the service")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="start the service")
+    serve.add_argument("--workers", type=int, help="worker processes, all cores by default")
+    serve.add_argument("--kernels", choices=kernels.BACKENDS, help="kernel backend, numpy by default")
+    run = commands.add_parser("run", help="run jobs on the service and record them in the results store")
+    run.add_argument("--algorithms", type=parse_list, default=list(algorithms), help="comma-separated algorithms")
+    run.add_argument("--functions", type=lambda text: parse_list(text, int), default=[0], help="comma-separated benchmark indices")
+    run.add_argument("--seeds", type=lambda text: parse_list(text, int), default=[0], help="comma-separated seeds, one job each")
+    run.add_argument("--lb", type=float, default=-100)
+    run.add_argument("--ub", type=float, default=100)
+    run.add_argument("--dim", type=int, default=30)
+    run.add_argument("--N", type=int, default=50)
+    run.add_argument("--iterations", type=int, default=1000)
+    run.add_argument("--precision", default="double")
+    run.add_argument("--budget", type=float, help="seconds per job")
+    commands.add_parser("stop", help="shut the service down")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        OptimizationService(args.address, workers=args.workers, kernel_backend=args.kernels).start().serveForever()
+        return
+
+    with ServiceClient(args.address) as client:
+        if args.command == "stop":
+            client.stop()
+            return
+        start_time = time.time()
+        jobs = {}
+        for objf_index in args.functions:
+            for algorithm_name in args.algorithms:
+                for seed in args.seeds:
+                    job_id = client.submit(algorithm_name, objf_index, args.lb, args.ub, args.dim, args.N,
+                                           args.iterations, seed=seed, precision=args.precision, budget=args.budget)
+                    jobs[job_id] = seed
+        results = []
+        for job_id, result in client.results():
+            if "error" in result:
+                print(f"{result['algorithm']} on {result['benchmark']} failed: {result['error']}")
+            else:
+                print(f"{result['algorithm']} on {result['benchmark']} (seed {jobs[job_id]}): "
+                      f"best fitness {result['best_fitness']:.6g} in {result['execution_time']:.2f} s")
+            results.append(result)
+        total_time = time.time() - start_time
+
+    with ResultsStore() as store:
+        store.recordCampaign(
+            "service",
+            results,
+            total_time,
+            processes=len({result["pid"] for result in results}),
+            parameters={"lb": args.lb, "ub": args.ub, "dim": args.dim, "N": args.N, "Max_iteration": args.iterations,
+                        "seeds": args.seeds, "precision": args.precision, "time_budget": args.budget},
+            started=start_time,
+        )
+    print(f"\nTotal Time: {total_time:.2f} seconds for {len(results)} jobs")
+
+
+if __name__ == "__main__":
+    main()
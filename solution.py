@@ -15,4 +15,6 @@ class solution:
         self.maxiers=0
         self.result = [[None,None]]
         self.ga = None
-        self.totalNoEvaluation = 0
\ No newline at end of file
+        self.totalNoEvaluation = 0
+        self.stopReason=" "
+        self.stopIteration=0
\ No newline at end of file
@@ -0,0 +1,113 @@
+import time
+
+# Stopping criteria shared by GEA, MFO and SSA. After every iteration the
+# optimizer asks each criterion whether to stop, passing the iteration just
+# completed, its convergence curve (filled up to and including that
+# iteration), the seconds elapsed since the run started and the positions
+# evaluated so far. A criterion
+# answers with a short reason or None. Criteria keep no per-run state, so
+# one instance can be shared by any number of runs. A run split into parts,
+# such as the islands of an island model, gives each part share() of it.
+
+
+class StoppingCriterion:
+    def check(self, iteration, convergence, elapsed, evaluations):
+        return None
+
+    def share(self, fraction):
+        """ the criterion for a part of a run that does `fraction` of its work """
+        return self
+
+
+class Stall(StoppingCriterion):
+    """ best fitness improved by no more than `tol` over `window` iterations """
+
+    def __init__(self, window=100, tol=0.0):
+        self.window = window
+        self.tol = tol
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        # convergence[0] is never filled, so compare against iteration 1 at the earliest
+        if iteration - self.window < 1:
+            return None
+        if convergence[iteration - self.window] - convergence[iteration] <= self.tol:
+            return "stall"
+        return None
+
+
+class RelativeImprovement(StoppingCriterion):
+    """ best fitness improved by less than `threshold` (relative) over `window` iterations """
+
+    def __init__(self, window=100, threshold=1e-8):
+        self.window = window
+        self.threshold = threshold
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        if iteration - self.window < 1:
+            return None
+        old = convergence[iteration - self.window]
+        improvement = (old - convergence[iteration]) / max(abs(old), 1e-300)
+        if improvement < self.threshold:
+            return "relative_improvement"
+        return None
+
+
+class TargetFitness(StoppingCriterion):
+    """ best fitness reached `value` """
+
+    def __init__(self, value):
+        self.value = value
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        if convergence[iteration] <= self.value:
+            return "target_fitness"
+        return None
+
+
+class TimeLimit(StoppingCriterion):
+    """ the run has used `seconds` of wall-clock time """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        if elapsed >= self.seconds:
+            return "time_limit"
+        return None
+
+
+class EvaluationBudget(StoppingCriterion):
+    """
+    the run has evaluated `evaluations` positions; checked after every
+    iteration, so a run may overshoot by up to one population
+    """
+
+    def __init__(self, evaluations):
+        self.evaluations = evaluations
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        if evaluations >= self.evaluations:
+            return "evaluation_budget"
+        return None
+
+    def share(self, fraction):
+        return EvaluationBudget(self.evaluations * fraction)
+
+
+def asCriteria(stopping):
+    """ None, a single criterion or a sequence of criteria, as a list """
+    if stopping is None:
+        return []
+    if isinstance(stopping, StoppingCriterion):
+        return [stopping]
+    return list(stopping)
+
+
+def stopReason(criteria, iteration, convergence, start_time, evaluations=0):
+    """ reason given by the first criterion that fires, or None """
+    elapsed = time.time() - start_time
+    for criterion in criteria:
+        reason = criterion.check(iteration, convergence, elapsed, evaluations)
+        if reason:
+            return reason
+    return None
@@ -0,0 +1,27 @@
+import pytest
+from functions import sphere
+from scheduler import splitBudget
+from stopping import EvaluationBudget
+from islands import islandModel
+from GEA import GEA
+from MFO import MFO
+from SSA import SSA
+
+
+@pytest.mark.parametrize("algorithm", [GEA, MFO, SSA])
+@pytest.mark.parametrize("budget", [0.0, -1.0])
+def test_spent_budget_runs_one_iteration(algorithm, budget):
+    s = algorithm(sphere, -5, 5, 5, 10, None, budget=budget)
+    assert s.stopReason == "time_budget"
+    assert s.stopIteration == 1
+
+
+def test_split_budget_of_a_spent_campaign():
+    assert splitBudget(-3.0, tasks=5, workers=2) == 0.0
+    assert splitBudget(12.0, tasks=5, workers=2) == 4.0
+
+
+def test_islands_share_one_evaluation_budget():
+    s = islandModel(SSA, sphere, -5, 5, 5, 40, 500, islands=2, stopping=[EvaluationBudget(1000)], rng=1)
+    assert s.stopReason == "evaluation_budget"
+    assert s.totalNoEvaluation == 1000
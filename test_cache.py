@@ -0,0 +1,45 @@
+import functools
+import numpy
+import pytest
+from functions import rastrigin
+from stopping import EvaluationBudget
+from evaluation_cache import EvaluationCache
+from GEA import GEA
+from MFO import MFO
+from SSA import SSA
+
+ALGORITHMS = {
+    "GEA": GEA,
+    "GEA-synchronous": functools.partial(GEA, synchronous=True),
+    "MFO": MFO,
+    "SSA": SSA,
+}
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_exact_cache_gives_identical_results(algorithm):
+    # narrow bounds clip many agents onto the same corners, so the cache is hit
+    cache = EvaluationCache(rastrigin)
+    plain = ALGORITHMS[algorithm](rastrigin, -1, 1, 2, 20, 40, rng=2)
+    cached = ALGORITHMS[algorithm](cache, -1, 1, 2, 20, 40, rng=2)
+    assert numpy.array_equal(cached.convergence, plain.convergence)
+    assert numpy.array_equal(cached.bestIndividual, plain.bestIndividual)
+    assert cached.totalNoEvaluation == plain.totalNoEvaluation
+    assert cache.hits > 0
+    assert cache.hits + cache.misses == plain.totalNoEvaluation
+
+
+def test_evaluation_budget_counts_cache_hits():
+    cache = EvaluationCache(rastrigin)
+    plain = SSA(rastrigin, -1, 1, 2, 20, 200, rng=2, stopping=[EvaluationBudget(500)])
+    cached = SSA(cache, -1, 1, 2, 20, 200, rng=2, stopping=[EvaluationBudget(500)])
+    assert (cached.stopReason, cached.stopIteration) == (plain.stopReason, plain.stopIteration)
+    assert cached.totalNoEvaluation == plain.totalNoEvaluation == 500
+
+
+def test_resolution_shares_the_first_fitness_of_a_cell():
+    cache = EvaluationCache(rastrigin, resolution=0.5)
+    first, nearby = numpy.array([[1.01, 2.0]]), numpy.array([[1.1, 2.0]])
+    assert cache(first)[0] == rastrigin(first)[0]
+    assert cache(nearby)[0] == rastrigin(first)[0] != rastrigin(nearby)[0]
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,62 @@
+import functools
+import numpy
+import pytest
+from functions import rastrigin
+from stopping import StoppingCriterion
+from checkpoint import Checkpoint, loadTaskResult, saveTaskResult
+from GEA import GEA
+from MFO import MFO
+from SSA import SSA
+
+ALGORITHMS = {
+    "GEA": GEA,
+    "GEA-synchronous": functools.partial(GEA, synchronous=True),
+    "MFO": MFO,
+    "MFO-loop": functools.partial(MFO, vectorized=False),
+    "SSA": SSA,
+}
+PARAMETERS = {"dim": 6, "N": 20, "Max_iteration": 40}
+
+
+class Interrupt(StoppingCriterion):
+    """ stops the run at `iteration`, as if it had been interrupted there """
+
+    def __init__(self, iteration):
+        self.iteration = iteration
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        return "interrupted" if iteration >= self.iteration else None
+
+
+def run(algorithm, seed, **options):
+    return ALGORITHMS[algorithm](rastrigin, -5, 5, 6, 20, 40, rng=seed, **options)
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_resumed_run_matches_uninterrupted_run(tmp_path, algorithm):
+    path = str(tmp_path / "snapshot.npz")
+    full = run(algorithm, 3)
+    interrupted = run(algorithm, 3, checkpoint=Checkpoint(path, 10, PARAMETERS), stopping=[Interrupt(20)])
+    assert interrupted.stopIteration == 20
+    # the snapshot carries the random stream, so the seed of the resumed run does not matter
+    resumed = run(algorithm, 99, checkpoint=Checkpoint(path, 10, PARAMETERS))
+    assert numpy.array_equal(resumed.convergence, full.convergence)
+    assert numpy.array_equal(resumed.bestIndividual, full.bestIndividual)
+    assert resumed.totalNoEvaluation == full.totalNoEvaluation
+    assert (resumed.stopReason, resumed.stopIteration) == (full.stopReason, full.stopIteration)
+    assert resumed.executionTime >= interrupted.executionTime
+
+
+def test_snapshot_of_other_parameters_is_not_resumed(tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    run("SSA", 3, checkpoint=Checkpoint(path, 10, PARAMETERS), stopping=[Interrupt(20)])
+    fresh = run("SSA", 99, checkpoint=Checkpoint(path, 10, dict(PARAMETERS, N=21)))
+    assert numpy.array_equal(fresh.convergence, run("SSA", 99).convergence)
+
+
+def test_task_result_only_loads_for_its_parameters(tmp_path):
+    result = {"algorithm": "SSA", "benchmark": "rastrigin", "best_fitness": 1.5}
+    saveTaskResult(str(tmp_path), result, PARAMETERS)
+    assert loadTaskResult(str(tmp_path), "SSA", "rastrigin", PARAMETERS) == result
+    assert loadTaskResult(str(tmp_path), "SSA", "rastrigin", dict(PARAMETERS, dim=7)) is None
+    assert loadTaskResult(str(tmp_path), "MFO", "rastrigin", PARAMETERS) is None
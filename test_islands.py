@@ -0,0 +1,40 @@
+import multiprocessing
+import threading
+from functions import sphere
+from stopping import StoppingCriterion
+from islands import islandModel
+from SSA import SSA
+
+
+class StopAt(StoppingCriterion):
+    def __init__(self, iteration):
+        self.iteration = iteration
+
+    def check(self, iteration, convergence, elapsed, evaluations):
+        return "stop_at" if iteration >= self.iteration else None
+
+
+class SmallestIslandStops(StoppingCriterion):
+    """ stops the smallest island at iteration 5, the others run on """
+
+    def share(self, fraction):
+        return StopAt(5) if fraction < 1 / 3 else StoppingCriterion()
+
+
+def test_islands_stopping_at_different_iterations_finish():
+    # Migrants large enough to fill a pipe keep arriving for the island
+    # that stopped first
+    results = []
+    run = threading.Thread(target=lambda: results.append(islandModel(
+        SSA, sphere, -5, 5, 500, 62, 30, islands=3, every=1, rate=0.5, rng=1, stopping=[SmallestIslandStops()]
+    )), daemon=True)
+    run.start()
+    run.join(60)
+    hung = run.is_alive()
+    if hung:
+        for child in multiprocessing.active_children():
+            child.terminate()
+    assert not hung, "islandModel hung"
+    s = results[0]
+    assert s.stopIteration == 29
+    assert s.totalNoEvaluation == 21 * 30 + 21 * 30 + 20 * 6
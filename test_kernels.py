@@ -0,0 +1,17 @@
+import numpy
+import pytest
+import kernels
+
+
+@pytest.mark.parametrize("kernel", [kernels.perm, kernels.powersum])
+def test_integer_positions_are_not_truncated(kernel):
+    positions = numpy.array([[1, 2, 2], [0, 1, 3]])
+    fitness = kernel(positions)
+    assert fitness.dtype == numpy.float64
+    assert numpy.array_equal(fitness, kernel(positions.astype(numpy.float64)))
+
+
+def test_single_precision_stays_single():
+    positions = numpy.ones((2, 3), dtype=numpy.float32)
+    assert kernels.perm(positions).dtype == numpy.float32
+    assert kernels.powersum(positions).dtype == numpy.float32
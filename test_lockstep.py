@@ -0,0 +1,40 @@
+import functools
+import numpy
+import pytest
+from functions import sphere, rastrigin, ackley, griewank
+from stopping import TargetFitness
+from lockstep import lockstep
+from GEA import GEA
+from MFO import MFO
+from SSA import SSA
+
+# lockstep GEA moves the whole flock at once
+STANDALONE = {"GEA": functools.partial(GEA, synchronous=True), "MFO": MFO, "SSA": SSA}
+OBJECTIVES = [sphere, rastrigin, ackley, griewank]
+
+
+@pytest.mark.parametrize("name", ["GEA", "MFO", "SSA"])
+@pytest.mark.parametrize("precision", ["double", "single"])
+def test_lockstep_runs_match_standalone_runs(kernel_backend, name, precision):
+    options = dict(lb=-10, ub=10, dim=6, N=20, Max_iteration=30, precision=precision)
+    batch = lockstep(name, OBJECTIVES, rngs=list(range(len(OBJECTIVES))), **options)
+    for seed, (objf, s) in enumerate(zip(OBJECTIVES, batch)):
+        alone = STANDALONE[name](objf, rng=seed, **options)
+        assert s.objfname == objf.__name__
+        assert numpy.array_equal(s.convergence, alone.convergence)
+        assert numpy.array_equal(s.bestIndividual, alone.bestIndividual)
+        assert s.totalNoEvaluation == alone.totalNoEvaluation
+        assert (s.stopReason, s.stopIteration) == (alone.stopReason, alone.stopIteration)
+
+
+@pytest.mark.parametrize("name", ["GEA", "MFO", "SSA"])
+def test_runs_leaving_the_batch_match_standalone_runs(numpy_backend, name):
+    # the runs reach the target at different iterations and drop out one by one
+    options = dict(lb=-5, ub=5, dim=4, N=20, Max_iteration=200, stopping=[TargetFitness(1e-1)])
+    batch = lockstep(name, sphere, rngs=[0, 1, 2, 3], **options)
+    assert len({s.stopIteration for s in batch}) > 1
+    for seed, s in enumerate(batch):
+        alone = STANDALONE[name](sphere, rng=seed, **options)
+        assert numpy.array_equal(s.convergence, alone.convergence)
+        assert s.totalNoEvaluation == alone.totalNoEvaluation
+        assert (s.stopReason, s.stopIteration) == (alone.stopReason, alone.stopIteration)
@@ -0,0 +1,16 @@
+import numpy
+import pytest
+from functions import sphere, rastrigin, ackley
+from MFO import MFO
+
+
+@pytest.mark.parametrize("objf", [sphere, rastrigin, ackley])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_update_matches_the_loop(numpy_backend, objf, seed):
+    # NumPy's exp and cos may differ from math's in the last bit, so the
+    # two updates agree to rounding rather than bit for bit
+    vectorized = MFO(objf, -10, 10, 5, 20, 30, vectorized=True, rng=seed)
+    loop = MFO(objf, -10, 10, 5, 20, 30, vectorized=False, rng=seed)
+    assert vectorized.stopIteration == loop.stopIteration
+    assert numpy.allclose(vectorized.convergence, loop.convergence, rtol=1e-10, atol=0)
+    assert numpy.allclose(vectorized.bestIndividual, loop.bestIndividual, rtol=0, atol=1e-10)
@@ -0,0 +1,31 @@
+import numpy
+import pytest
+from SSA import _follow_chain
+
+
+def follow_chain_loop(SalpPositions, first):
+    """ Eq. (3.4) one follower after the other, as in the original SSA """
+    for i in range(first, SalpPositions.shape[-2]):
+        SalpPositions[..., i, :] = (SalpPositions[..., i - 1, :] + SalpPositions[..., i, :]) / 2
+
+
+@pytest.mark.parametrize("followers", [40, 63, 64, 65, 128, 129, 200])
+@pytest.mark.parametrize("leaders", [1, 30])
+@pytest.mark.parametrize("dtype, atol", [(numpy.float64, 1e-10), (numpy.float32, 1e-4)])
+def test_blocked_chain_matches_the_loop(kernel_backend, followers, leaders, dtype, atol):
+    rng = numpy.random.default_rng(followers + leaders)
+    positions = rng.uniform(-100, 100, (leaders + followers, 5)).astype(dtype)
+    expected = positions.copy()
+    _follow_chain(positions, leaders)
+    follow_chain_loop(expected, leaders)
+    assert positions.dtype == dtype
+    assert numpy.allclose(positions, expected, rtol=0, atol=atol)
+
+
+def test_runs_are_chains_of_their_own(numpy_backend):
+    positions = numpy.random.default_rng(1).uniform(-100, 100, (3, 150, 4))
+    expected = positions.copy()
+    _follow_chain(positions, 75)
+    for run in expected:
+        follow_chain_loop(run, 75)
+    assert numpy.allclose(positions, expected, rtol=0, atol=1e-10)